@@ -1,10 +1,16 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-import plotly.express as px
-import os, hmac, hashlib
+import os, hmac, hashlib, threading, resource, time
 
-DB_PATH = "/data/Gasto.db"  # caminho local do banco
+import consultas
+from cache_lru import CacheLRU
+import instantaneo
+import migracoes
+import tarefas
+
+DB_PATH = os.environ.get("DB_PATH", "/data/Gasto.db")  # caminho local do banco
+INSTANTANEO_PATH = instantaneo.caminho_para(DB_PATH)  # frame colunar ao lado do banco
 
 # CONFIGURAÇÃO DE PÁGINA
 
@@ -58,64 +64,219 @@ def logout_button():
             st.rerun()
         else:
             st.experimental_rerun()
-            
-
-require_login()
-logout_button()
 
 
 # FUNÇÃO DE LEITURA
 
-@st.cache_data
-def carregar_dados():
-    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
-    df_gastos = pd.read_sql_query("SELECT * FROM Gastos", conn)
-    df_cat = pd.read_sql_query("SELECT * FROM Categorias", conn)
-    conn.close()
+@st.cache_resource
+def _estado_dados():
+    # Frame compartilhado entre as sessões do processo + marca d'água (maior id lido).
+    # Não alterar o frame devolvido: o histórico só escolhe colunas na exibição (sem cópia).
+    return {"df": None, "max_id": 0, "reescritas": None, "ordem_data": None, "lock": threading.Lock()}
 
-    # para evitar erros na leitura da data
-    df_gastos["data"] = df_gastos["data"].astype(str).str.strip()
 
-    mask_date_only = df_gastos["data"].str.len() == 10  # "YYYY-MM-DD"
-    df_gastos.loc[mask_date_only, "data"] = (
-        df_gastos.loc[mask_date_only, "data"] + " 00:00:00"
-    )
+def conectar_leitura():
+    return sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+
+
+def carregar_dados(estado=None):
+    """Lê só os gastos novos (id acima da marca); recarrega tudo se houve UPDATE/DELETE.
 
-    df_gastos["data"] = pd.to_datetime(
-        df_gastos["data"],
-        format="%Y-%m-%d %H:%M:%S",
-        errors="coerce",
+    A carga completa parte do instantâneo em disco (instantaneo.py) quando ele ainda vale.
+    """
+    estado = estado or _estado_dados()
+    conn = conectar_leitura()
+    try:
+        with estado["lock"]:
+            r = conn.execute(
+                "SELECT versao FROM Versoes WHERE tabela = 'Gastos_reescritas'"
+            ).fetchone()
+            reescritas = r[0] if r else None
+
+            if estado["df"] is None or reescritas is None or reescritas != estado["reescritas"]:
+                estado["df"] = None  # solta o frame antigo antes de ler o novo (pico de memória)
+                # instantâneo Arrow mapeado + delta do banco (ou tudo do banco, se inválido)
+                df, reescritas, _ = instantaneo.carregar(conn, INSTANTANEO_PATH)
+            else:
+                df = consultas.concatenar([estado["df"], consultas.gastos(conn, desde_id=estado["max_id"])])
+
+            if df is not estado["df"]:
+                estado["ordem_data"] = None  # (frame, ordem); recalculada sob demanda em ordem_data()
+            estado["df"] = df
+            estado["reescritas"] = reescritas
+            estado["max_id"] = int(df["id"].max()) if not df.empty else 0
+    finally:
+        conn.close()
+
+    return estado["df"]
+
+
+def ordem_data(df, estado=None):
+    """Ordem (data, id) do frame, calculada uma vez por versão do frame.
+
+    Fica guardada junto com o frame para o qual foi calculada: uma sessão que
+    ainda segura um frame anterior ao atual calcula a ordem dele sem gravar no
+    cache (nem reaproveitar a de outro frame).
+    """
+    estado = estado or _estado_dados()
+    with estado["lock"]:
+        guardada = estado["ordem_data"]
+        if guardada is not None and guardada[0] is df:
+            return guardada[1]
+        ordem = consultas.ordem_por_data(df)
+        if df is estado["df"]:
+            estado["ordem_data"] = (df, ordem)
+        return ordem
+
+
+# GRÁFICOS EM CACHE
+# Figuras e agregados montados ficam num LRU do processo (compartilhado entre
+# sessões), com os filtros, o tipo de gráfico e a versão dos dados na chave.
+
+@st.cache_resource
+def _cache_graficos():
+    return CacheLRU(max_bytes=32 * 2**20)
+
+
+def _grafico_categoria(cat_sum, tipo_grafico):
+    import plotly.express as px  # adiado: só quem monta gráfico paga o import (~0,2 s)
+
+    if tipo_grafico == "Barras":
+        fig = px.bar(
+            cat_sum,
+            x="categoria",
+            y="valor",
+            color="categoria",
+            text=[f"R$ {v:,.2f}" for v in cat_sum["valor"]],
+            title="Distribuição de gastos",
+        )
+
+        fig.update_layout(
+            xaxis_title="Categoria",
+            yaxis_title="Valor (R$)",
+            uniformtext_mode="hide",
+            uniformtext_minsize=15,
+            showlegend=False,
+        )
+
+        fig.update_traces(
+            hovertemplate="Gasto total: R$ %{value:,.2f}<extra></extra>",
+            textposition="inside",
+            insidetextanchor="middle",
+        )
+    else:
+        fig = px.pie(
+            cat_sum,
+            names="categoria",
+            values="valor",
+            title="Distribuição de gastos",
+            hole=0.5,
+        )
+        fig.update_traces(
+            hovertemplate="Gasto total: R$ %{value:,.2f}",
+            textinfo="percent+label",
+            pull=[0.05] * len(cat_sum),
+        )
+    return fig
+
+
+def _grafico_mes(mes_sum):
+    import plotly.express as px
+
+    return px.line(mes_sum, x="mes", y="valor", title="Evolução mensal")
+
+
+def _opcoes(conn):
+    return consultas.usuarios(conn), consultas.categorias(conn), consultas.meses(conn)
+
+
+def _graficos_padrao(cache, conn, versao, filtros, tipo_grafico):
+    """Resumo e figuras de uma combinação de filtros, pelo LRU (mesmas chaves da página)."""
+    chave = (filtros["usuario"], filtros["categoria_id"], filtros["mes"])
+    resumo = cache.obter(("resumo",) + chave + (versao,), lambda: consultas.resumo(conn, **filtros))
+    fig_cat = cache.obter(
+        ("categoria",) + chave + (tipo_grafico, versao),
+        lambda: _grafico_categoria(consultas.por_categoria(conn, **filtros), tipo_grafico),
     )
+    fig_mes = cache.obter(
+        ("mes",) + chave + ("Linha", versao),
+        lambda: _grafico_mes(consultas.por_mes(conn, **filtros)),
+    )
+    return resumo, fig_cat, fig_mes
+
+
+# AQUECIMENTO
+# Na primeira execução do script (a tela de login da primeira sessão) uma thread
+# carrega o frame do histórico e monta a visão padrão (sem filtros, barras) no
+# LRU: quem faz login encontra tudo pronto em vez de pagar a partida a frio.
+
+FILTROS_PADRAO = {"usuario": None, "categoria_id": None, "mes": None}
+
 
-    return df_gastos, df_cat
+def _aquecer(estado, cache):
+    t0 = time.perf_counter()
+    try:
+        import plotly.express  # noqa: F401  (carrega o módulo uma vez, fora da sessão)
+
+        conn = conectar_leitura()
+        try:
+            if consultas.existe_gasto(conn):
+                versao = consultas.versao_dados(conn)
+                cache.obter(("opcoes", versao), lambda: _opcoes(conn))
+                _graficos_padrao(cache, conn, versao, FILTROS_PADRAO, "Barras")
+        finally:
+            conn.close()
+        ordem_data(carregar_dados(estado), estado)
+        print(f"Dashboard aquecido em {time.perf_counter() - t0:.2f} s", flush=True)
+    except Exception as e:  # banco ainda inexistente etc.: a sessão carrega sob demanda
+        print(f"Aquecimento do dashboard falhou: {e}", flush=True)
+
+
+@st.cache_resource
+def _iniciar_aquecimento():
+    t = threading.Thread(target=_aquecer, args=(_estado_dados(), _cache_graficos()), daemon=True)
+    t.start()
+    return t
+
+
+# Banco antigo (ainda sem ResumoMensal etc.) é migrado aqui mesmo; idempotente e
+# sem DDL quando já está em dia. Sem o arquivo, espera a API criá-lo.
+try:
+    _banco_pronto, _erro_banco = migracoes.migrar_se_existir(DB_PATH), None
+except sqlite3.Error as e:
+    _banco_pronto, _erro_banco = False, e
+_iniciar_aquecimento()
+tarefas.iniciar(DB_PATH)  # worker das tarefas da Gerência (tarefas.py), um por processo
+require_login()
+logout_button()
+if _erro_banco is not None:
+    st.error(f"Não foi possível atualizar o esquema do banco: {_erro_banco}")
+    st.stop()
+if not _banco_pronto:
+    st.info("Banco de dados ainda não criado: ele aparece quando a API subir pela primeira vez.")
+    st.stop()
 
 
 # CARREGAMENTO
+# Métricas e gráficos vêm agregados do SQLite (consultas.py, lendo a tabela
+# ResumoMensal); o pandas só recebe os resultados do GROUP BY.
 
 st.title("💸 Dashboard de Gastos Pessoais")
 
 try:
-    df_gastos, df_cat = carregar_dados()
+    conn = conectar_leitura()
+    tem_dados = consultas.existe_gasto(conn)
 except Exception as e:
     st.error(f"Erro ao carregar o banco: {e}")
     st.stop()
 
-if df_gastos.empty:
+if not tem_dados:
+    conn.close()
     st.warning("Nenhum dado encontrado no banco de dados.")
     st.stop()
 
-
-# PRÉ-PROCESSAMENTO
-
-df_gastos["data"] = pd.to_datetime(df_gastos["data"], errors="coerce")
-df_gastos["mes"] = df_gastos["data"].dt.to_period("M").astype(str)
-
-
-# ATUALIZAÇÃO MANUAL
-
-if st.sidebar.button("Atualizar agora"):
-    st.cache_data.clear()
-    st.rerun()
+cache = _cache_graficos()
+versao = consultas.versao_dados(conn)
 
 
 # FILTROS
@@ -129,93 +290,109 @@ st.sidebar.divider()
 
 st.sidebar.header("Filtros")
 
-usuarios = ["Todos"] + sorted(df_gastos["usuario"].dropna().unique().tolist())
+usuarios_db, df_cat, meses_db = cache.obter(
+    ("opcoes", versao),
+    lambda: _opcoes(conn),
+)
+
+usuarios = ["Todos"] + usuarios_db
 usuario_sel = st.sidebar.selectbox("Usuário", usuarios)
 
-categorias = ["Todas"] + sorted(df_gastos["categoria"].dropna().unique().tolist())
+# filtros usam o id da categoria; o nome só entra na exibição
+ids_cat = dict(zip(df_cat["nome"], df_cat["id"]))
+categorias = ["Todas"] + df_cat["nome"].tolist()
 categoria_sel = st.sidebar.selectbox("Categoria", categorias)
 
-meses = ["Todos"] + sorted(df_gastos["mes"].dropna().unique().tolist())
+meses = ["Todos"] + meses_db
 mes_sel = st.sidebar.selectbox("Mês", meses)
 
 
 # APLICA FILTROS
 
-df_filtrado = df_gastos.copy()
-if usuario_sel != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["usuario"] == usuario_sel]
-if categoria_sel != "Todas":
-    df_filtrado = df_filtrado[df_filtrado["categoria"] == categoria_sel]
-if mes_sel != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["mes"] == mes_sel]
+filtros = {
+    "usuario": None if usuario_sel == "Todos" else usuario_sel,
+    "categoria_id": None if categoria_sel == "Todas" else ids_cat[categoria_sel],
+    "mes": None if mes_sel == "Todos" else mes_sel,
+}
+
+(total, media, qtd), fig1, fig2 = _graficos_padrao(cache, conn, versao, filtros, tipo_grafico)
+conn.close()
 
 
 # MÉTRICAS RÁPIDAS
 
 col1, col2, col3 = st.columns(3)
-col1.metric("Total gasto", f"R$ {df_filtrado['valor'].sum():,.2f}")
-col2.metric("Média por compra", f"R$ {df_filtrado['valor'].mean():,.2f}")
-col3.metric("Total de compras", len(df_filtrado))
+col1.metric("Total gasto", f"R$ {total:,.2f}")
+col2.metric("Média por compra", f"R$ {(media or 0):,.2f}")
+col3.metric("Total de compras", qtd)
 
 
 # GRÁFICOS
 
 st.subheader("Gastos por categoria")
-
-cat_sum = df_filtrado.groupby("categoria", as_index=False)["valor"].sum().sort_values(
-    "valor", ascending=False
-)
-
-if tipo_grafico == "Barras":
-    fig1 = px.bar(
-        cat_sum,
-        x="categoria",
-        y="valor",
-        color="categoria",
-        text=cat_sum["valor"].apply(lambda v: f"R$ {v:,.2f}"),
-        title="Distribuição de gastos",
-    )
-
-    fig1.update_layout(
-        xaxis_title="Categoria",
-        yaxis_title="Valor (R$)",
-        uniformtext_mode="hide",
-        uniformtext_minsize=15,
-        showlegend=False,
-    )
-
-    fig1.update_traces(
-        hovertemplate="Gasto total: R$ %{value:,.2f}<extra></extra>",
-        textposition="inside",
-        insidetextanchor="middle",
-    )
-else:
-    fig1 = px.pie(
-        cat_sum,
-        names="categoria",
-        values="valor",
-        title="Distribuição de gastos",
-        hole=0.5,
-    )
-    fig1.update_traces(
-        hovertemplate="Gasto total: R$ %{value:,.2f}",
-        textinfo="percent+label",
-        pull=[0.05] * len(cat_sum),
-    )
-
-
 st.plotly_chart(fig1)
 
 st.subheader("Gastos por mês")
-mes_sum = df_filtrado.groupby("mes", as_index=False)["valor"].sum()
-fig2 = px.line(mes_sum, x="mes", y="valor", title="Evolução mensal")
-
-
 st.plotly_chart(fig2)
 
 
 st.subheader("Histórico de compras")
-df_hist = df_gastos.copy()
-df_hist = df_hist.drop(columns=["mes"], errors="ignore")
+df_hist = carregar_dados()
+
+c1, c2, c3 = st.columns([3, 2, 1])
+busca = c1.text_input("Buscar na descrição", key="hist_busca").strip()
+ordenacao = c2.selectbox("Ordenar por", list(consultas.ORDENACOES), key="hist_ordem")
+tamanho = c3.selectbox("Linhas por página", [25, 50, 100, 250], key="hist_tamanho")
+
+# Cursores (keyset) do início de cada página já visitada; recomeça se mudar busca/ordem/tamanho
+assinatura = (busca, ordenacao, tamanho)
+if st.session_state.get("hist_assinatura") != assinatura:
+    st.session_state["hist_assinatura"] = assinatura
+    st.session_state["hist_cursores"] = [None]
+cursores = st.session_state["hist_cursores"]
+
+linhas, proximo, tem_mais = consultas.pagina(
+    df_hist,
+    tamanho,
+    ordenacao,
+    apos=cursores[-1],
+    busca=busca or None,
+    ordem_data=ordem_data(df_hist) if consultas.ORDENACOES[ordenacao][0] == "data" else None,
+)
+
+# Só a página vai para o navegador; column_order esconde colunas sem copiar
+st.dataframe(
+    linhas,
+    hide_index=True,
+    column_order=["id", "data", "categoria", "valor", "descricao", "usuario"],
+)
 
-st.dataframe(df_hist, hide_index=True)
+n1, n2, n3, n4 = st.columns([1, 1, 1, 3])
+if n1.button("⏮️ Início", disabled=len(cursores) == 1):
+    st.session_state["hist_cursores"] = [None]
+    st.rerun()
+if n2.button("◀️ Anterior", disabled=len(cursores) == 1):
+    cursores.pop()
+    st.rerun()
+if n3.button("Próxima ▶️", disabled=not tem_mais):
+    cursores.append(proximo)
+    st.rerun()
+n4.caption(f"Página {len(cursores)} · {len(linhas)} linha(s)")
+
+with st.expander("🩺 Diagnóstico de memória"):
+    uso = df_hist.memory_usage(deep=True, index=True)
+    st.write(
+        f"Frame do histórico: **{uso.sum() / 2**20:,.1f} MB** em {len(df_hist):,} linhas · "
+        f"pico do processo (RSS): **{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB**"
+    )
+    e = cache.estatisticas()
+    st.write(
+        f"Cache de gráficos: {e['itens']} itens, {e['bytes'] / 1024:,.0f} KB de {e['max_bytes'] / 2**20:,.0f} MB · "
+        f"acertos {e['acertos']} · falhas {e['falhas']} · despejos {e['despejos']}"
+    )
+    st.dataframe(
+        pd.DataFrame({
+            "tipo": df_hist.dtypes.astype(str).reindex(uso.index).fillna(""),
+            "MB": (uso / 2**20).round(2),
+        }),
+    )
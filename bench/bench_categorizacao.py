@@ -0,0 +1,62 @@
+"""Benchmark da categorização: loop antigo x automato.
+
+Mostra o tempo por descrição com 100 a 100k palavras-chave.
+Uso: python -m bench.bench_categorizacao
+"""
+
+import random
+import string
+import time
+
+from categorizador import Automato
+
+TAMANHOS = (100, 1_000, 10_000, 100_000)
+N_DESCRICOES = 2_000
+
+
+def _palavra(rng):
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 14)))
+
+
+def _loop_antigo(categorias, descricao_lower):
+    for palavra, cat in categorias:
+        if palavra.lower() in descricao_lower:
+            return cat
+    return None
+
+
+def _medir(fn, descricoes):
+    t0 = time.perf_counter()
+    for d in descricoes:
+        fn(d)
+    return (time.perf_counter() - t0) / len(descricoes) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'palavras':>9} | {'build (s)':>9} | {'loop (us)':>10} | {'automato (us)':>13}")
+    for n in TAMANHOS:
+        categorias = [(_palavra(rng), f"Cat{i % 50}") for i in range(n)]
+        # metade das descrições casa alguma palavra, metade não
+        descricoes = []
+        for i in range(N_DESCRICOES):
+            base = f"compra {_palavra(rng)} ltda"
+            if i % 2:
+                base = f"{base} {rng.choice(categorias)[0]}"
+            descricoes.append(base.lower())
+
+        t0 = time.perf_counter()
+        automato = Automato((p.lower(), c) for p, c in categorias)
+        build = time.perf_counter() - t0
+
+        for d in descricoes[:200]:
+            assert automato.primeiro(d) == _loop_antigo(categorias, d)
+
+        amostra = descricoes[:200] if n >= 10_000 else descricoes
+        t_loop = _medir(lambda d: _loop_antigo(categorias, d), amostra)
+        t_auto = _medir(automato.primeiro, descricoes)
+        print(f"{n:>9} | {build:>9.2f} | {t_loop:>10.1f} | {t_auto:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Latência de receber_notificacao: conexão por chamada x conexão persistente.
+
+Uso: python -m bench.bench_conexao [n_requisicoes]
+"""
+
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import itertools
+import time
+
+N_PADRAO = 2_000
+_seq = itertools.count()
+
+
+def _proxima_data():
+    # datas distintas para nenhuma requisição cair na supressão de duplicados
+    return f"2025-01-01 12:00:00.{next(_seq)}"
+
+
+def _conectar_antigo():
+    # Comportamento anterior: abre conexão e aplica PRAGMAs a cada chamada
+    os.makedirs(os.path.dirname(main.DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(main.DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA busy_timeout=3000;")
+    return conn
+
+
+def _rodar(cliente, n):
+    lat = []
+    for _ in range(n):
+        payload = {
+            "titulo": "Compra aprovada",
+            "mensagem": "Compra de R$ 23,90 APROVADA em PADARIA CENTRAL.",
+            "app": "com.nu.production",
+            "data": _proxima_data(),
+        }
+        t0 = time.perf_counter()
+        r = cliente.post("/notificacaos", json=payload)
+        lat.append((time.perf_counter() - t0) * 1000)
+        assert r.status_code == 200, r.get_json()
+    lat.sort()
+    return statistics.median(lat), lat[int(len(lat) * 0.99) - 1]
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_PADRAO
+    tmp = tempfile.mkdtemp()
+    os.environ["DB_PATH"] = os.path.join(tmp, "Gasto.db")
+    import main
+
+    main.print = lambda *a, **k: None  # silencia o log por requisição
+    cliente = main.app.test_client()
+
+    conectar_novo = main.conectar
+    main.conectar = _conectar_antigo
+    p50_a, p99_a = _rodar(cliente, n)
+    main.conectar = conectar_novo
+    p50_d, p99_d = _rodar(cliente, n)
+
+    print(f"{'modo':<22} | {'p50 (ms)':>8} | {'p99 (ms)':>8}")
+    print(f"{'conexão por chamada':<22} | {p50_a:>8.3f} | {p99_a:>8.3f}")
+    print(f"{'conexão persistente':<22} | {p50_d:>8.3f} | {p99_d:>8.3f}")
@@ -0,0 +1,68 @@
+"""Vazão e p99 de /notificacaos: commit por requisição x fila com commit em grupo.
+
+Roda 1, 10 e 50 clientes concorrentes (threads usando o test client do Flask).
+Uso: python -m bench.bench_fila [requisicoes_por_cenario]
+"""
+
+import os
+import sys
+import tempfile
+import itertools
+import threading
+import time
+
+CONCORRENCIAS = (1, 10, 50)
+PAYLOAD = {
+    "titulo": "Compra aprovada",
+    "mensagem": "Compra de R$ 45,10 APROVADA em POSTO SHELL.",
+    "app": "com.nu.production",
+}
+_seq = itertools.count()
+
+
+def _cenario(main, n, clientes, url):
+    por_cliente = n // clientes
+    latencias = []
+    trava = threading.Lock()
+
+    def trabalhar():
+        cliente = main.app.test_client()
+        locais = []
+        for _ in range(por_cliente):
+            t0 = time.perf_counter()
+            # datas distintas para nenhuma requisição cair na supressão de duplicados
+            r = cliente.post(url, json=dict(PAYLOAD, data=f"2025-01-01 12:00:00.{next(_seq)}"))
+            locais.append((time.perf_counter() - t0) * 1000)
+            assert r.status_code in (200, 202), r.get_json()
+        with trava:
+            latencias.extend(locais)
+
+    threads = [threading.Thread(target=trabalhar) for _ in range(clientes)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - t0
+    latencias.sort()
+    return len(latencias) / total, latencias[int(len(latencias) * 0.99) - 1]
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "Gasto.db")
+    import main
+
+    main.print = lambda *a, **k: None  # silencia o log por requisição
+    modos = [
+        ("direto", False, "/notificacaos"),
+        ("fila", True, "/notificacaos"),
+        ("fila+aguardar", True, "/notificacaos?aguardar=1"),
+    ]
+    print(f"{'modo':<14} | {'clientes':>8} | {'req/s':>8} | {'p99 (ms)':>8}")
+    for nome, em_lote, url in modos:
+        main.GRAVACAO_EM_LOTE = em_lote
+        for c in CONCORRENCIAS:
+            vazao, p99 = _cenario(main, n, c, url)
+            print(f"{nome:<14} | {c:>8} | {vazao:>8.0f} | {p99:>8.2f}")
+    main.gravador().parar()
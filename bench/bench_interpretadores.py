@@ -0,0 +1,63 @@
+"""Vazão dos interpretadores de mensagem por banco x regex genéricas antigas.
+
+Uso: python -m bench.bench_interpretadores [repeticoes]
+"""
+
+import re
+import sys
+import time
+
+from interpretadores import interpretar_mensagem
+
+CORPUS = {
+    "com.nu.production": [
+        "Compra de R$ 23,90 APROVADA em PADARIA CENTRAL para o cartão com final 1234",
+        "Compra de R$ 1.250,00 APROVADA em MAGAZINE LUIZA.",
+        "Compra de R$ 8,50 APROVADA em UBER *TRIP - cartão final 1234",
+        "Compra de R$ 99,99 RECUSADA em STEAM GAMES para o cartão com final 1234",
+    ],
+    "br.com.intermedium": [
+        "Compra aprovada no valor de R$ 50,00 em SUPERMERCADO GIASSI.",
+        "Compra aprovada no valor de R$ 12,35 em IFOOD *RESTAURANTE, cartão final 9876",
+        "Compra recusada no valor de R$ 300,00 em POSTO IPIRANGA.",
+    ],
+    "outro.app": [
+        "Você fez uma compra de R$ 15,00 em FARMACIA SAO JOAO.",
+        "Pagamento de R$ 40,00 recebido",
+    ],
+}
+
+
+def _antigo(mensagem):
+    padrao_valor = re.search(r"R\$ ?(\d{1,7}(?:\.\d{3})*,\d{2})", mensagem)
+    valor = float(padrao_valor.group(1).replace(".", "").replace(",", ".")) if padrao_valor else None
+    padrao_local = re.search(r"em\s+([\wÀ-ÿ\s&._*-]+?)(?=(?:[.,\-:]|\bpara\b|$))", mensagem, re.IGNORECASE)
+    descricao = padrao_local.group(1).strip() if padrao_local else "Nao identificado"
+    return valor, descricao
+
+
+def main():
+    rep = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for app, mensagens in CORPUS.items():
+        for m in mensagens:
+            # valor e local precisam bater com as regex antigas
+            assert interpretar_mensagem(app, m)[:2] == _antigo(m), m
+
+    print(f"{'app':<20} | {'antigo (msg/s)':>14} | {'registro (msg/s)':>16}")
+    for app, mensagens in CORPUS.items():
+        n = rep * len(mensagens)
+        t0 = time.perf_counter()
+        for _ in range(rep):
+            for m in mensagens:
+                _antigo(m)
+        t_antigo = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(rep):
+            for m in mensagens:
+                interpretar_mensagem(app, m)
+        t_novo = time.perf_counter() - t0
+        print(f"{app:<20} | {n / t_antigo:>14.0f} | {n / t_novo:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
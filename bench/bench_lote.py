@@ -0,0 +1,46 @@
+"""Vazão (linhas/s) de /notificacaos item a item x /notificacaos/batch.
+
+Meta (README): lote de 200 >= 10x o item a item; lote de 50 >= 5x.
+
+Uso: python -m bench.bench_lote [n_linhas] [tamanho_lote]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+
+def _payload(i):
+    return {
+        "titulo": "Compra aprovada",
+        "mensagem": f"Compra de R$ {i % 500},{i % 100:02d} APROVADA em LOJA {i % 40}.",
+        "app": "br.com.intermedium",
+        "data": f"2025-01-01 12:00:00.{i}",  # distintas: sem duplicados
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    lote = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "Gasto.db")
+    import main
+
+    main.print = lambda *a, **k: None  # silencia o log por requisição
+    cliente = main.app.test_client()
+    itens = [_payload(i) for i in range(n)]
+
+    t0 = time.perf_counter()
+    for item in itens:
+        assert cliente.post("/notificacaos", json=item).status_code == 200
+    itens = [_payload(i + n) for i in range(n)]
+    t_item = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(0, n, lote):
+        r = cliente.post("/notificacaos/batch", json=itens[i:i + lote])
+        assert r.status_code == 200, r.get_json()
+    t_lote = time.perf_counter() - t0
+
+    print(f"item a item : {n / t_item:>9.0f} linhas/s")
+    print(f"lote de {lote:<4}: {n / t_lote:>9.0f} linhas/s ({t_item / t_lote:.1f}x)")
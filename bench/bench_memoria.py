@@ -0,0 +1,100 @@
+"""Pico de memória (RSS) do frame do histórico com N gastos sintéticos.
+
+Compara a leitura compacta (`consultas.gastos`: blocos, categorias, int32) com
+a leitura antiga (um read_sql_query inteiro, tudo object) e falha (exit 1)
+se o pico da compacta passar do limite. Cada medição roda num processo
+separado para o pico de um não contaminar o outro.
+
+Uso: python -m bench.bench_memoria [n_linhas] [limite_mb]
+     (padrão: 1.000.000 linhas, limite 256 MB — metade da VM do dashboard)
+"""
+
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+LOCAIS = [f"LOJA {i}" for i in range(800)] + ["PADARIA CENTRAL", "POSTO IPIRANGA", "IFOOD *RESTAURANTE"]
+
+
+def popular(caminho, n):
+    from datas import normalizar_data
+    from migracoes import migrar
+
+    conn = sqlite3.connect(caminho)
+    conn.isolation_level = None
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=OFF;")
+    migrar(conn)
+    r = random.Random(42)
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO NomesCategorias (nome) VALUES (?)", [(f"Categoria {i}",) for i in range(60)])
+
+    def linhas():
+        for i in range(n):
+            iso, epoch, mes = normalizar_data(
+                f"20{20 + i % 6}-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00"
+            )
+            yield (iso, r.randint(2, 61), round(r.uniform(1, 900), 2), r.choice(LOCAIS),
+                   r.choice(("Pessoal", "Conjunto")), epoch, mes)
+
+    conn.executemany(
+        "INSERT INTO Gastos (data, categoria_id, valor, descricao, usuario, data_epoch, mes) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        linhas(),
+    )
+    conn.execute("COMMIT")
+    conn.close()
+
+
+def medir(caminho, modo):
+    import pandas as pd
+
+    import consultas
+
+    conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    t0 = time.perf_counter()
+    if modo == "compacto":
+        df = consultas.gastos(conn)
+    else:  # como o dashboard lia antes
+        df = pd.read_sql_query(
+            "SELECT id, data, categoria_id, categoria, valor, descricao, usuario FROM GastosDetalhados ORDER BY id",
+            conn,
+        )
+        df["data"] = pd.to_datetime(df["data"].astype(str).str.strip(), format="%Y-%m-%d %H:%M:%S", errors="coerce")
+        df["mes"] = df["data"].dt.to_period("M").astype(str)
+    dt = time.perf_counter() - t0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    frame = df.memory_usage(deep=True).sum() / 2**20
+    print(f"{modo:<9}: frame {frame:7.1f} MB | pico RSS {pico:7.1f} MB (processo antes: {base:.1f}) | {dt:.1f} s")
+    return pico
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--medir":
+        pico = medir(sys.argv[2], sys.argv[3])
+        sys.exit(0 if pico <= float(sys.argv[4]) else 1)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    limite = float(sys.argv[2]) if len(sys.argv) > 2 else 256.0
+    caminho = os.path.join(tempfile.mkdtemp(), "Gasto.db")
+    t0 = time.perf_counter()
+    popular(caminho, n)
+    print(f"{n:,} gastos sintéticos em {time.perf_counter() - t0:.1f} s")
+
+    ok = True
+    for modo in ("compacto", "antigo"):
+        r = subprocess.run([sys.executable, "-m", "bench.bench_memoria", "--medir", caminho, modo, str(limite)],
+                           cwd=RAIZ)
+        if modo == "compacto" and r.returncode != 0:
+            ok = False
+            print(f"FALHOU: pico da leitura compacta acima de {limite:.0f} MB")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,137 @@
+"""Partida a frio: do início do processo até a primeira resposta útil.
+
+- API: sobe um gunicorn local com e sem `preload_app` (gunicorn.conf.py) e
+  mede o tempo até o primeiro 200 no /health e até o primeiro POST
+  /notificacaos gravado, mais a pior latência das primeiras requisições em
+  conexões novas (cada uma pode cair num worker diferente).
+- Dashboard (`--dash`): com o AppTest do Streamlit, mede a primeira tela
+  logada sem aquecimento e depois de uma tela de login seguida de uma pausa
+  (o usuário digitando a senha) em que a thread de aquecimento trabalha.
+
+Cada medição roda num processo novo, contra um banco temporário com N gastos.
+
+Uso: python -m bench.bench_partida [--linhas 200000] [--workers 2] [--repeticoes 3] [--dash]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench.bench_memoria import popular  # noqa: E402
+from bench.carga import _esperar_health, _porta_livre, gerar_payloads  # noqa: E402
+
+
+def _post(porta, payload):
+    conn = http.client.HTTPConnection("127.0.0.1", porta, timeout=30)
+    try:
+        conn.request("POST", "/notificacaos", body=json.dumps(payload),
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+
+def medir_api(db_path, preload, workers, payloads):
+    porta = _porta_livre()
+    cmd = [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{porta}", "-w", str(workers),
+           "--log-level", "warning"]
+    if preload:
+        cmd += ["-c", os.path.join(RAIZ, "gunicorn.conf.py")]
+    cmd.append("main:app")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=RAIZ, env=dict(os.environ, DB_PATH=db_path), stdout=subprocess.DEVNULL)
+    try:
+        _esperar_health(porta, timeout=120)
+        health = time.perf_counter() - t0
+        while _post(porta, payloads[0]) != 200:
+            time.sleep(0.05)
+        primeira = time.perf_counter() - t0
+        piores = []
+        for p in payloads[1:]:
+            t = time.perf_counter()
+            _post(porta, p)
+            piores.append(time.perf_counter() - t)
+        return health, primeira, max(piores)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def medir_dash(db_path, aquecido, pausa):
+    """Roda num processo próprio: segundos da primeira tela logada."""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["DB_PATH"] = db_path
+    arquivo = os.path.join(RAIZ, "Dashboard.py")
+    if aquecido:
+        AppTest.from_file(arquivo, default_timeout=120).run()  # tela de login dispara o aquecimento
+        time.sleep(pausa)
+    at = AppTest.from_file(arquivo, default_timeout=120)
+    at.session_state["auth_ok"] = True
+    t0 = time.perf_counter()
+    at.run()
+    dt = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return dt
+
+
+def _fmt(valores):
+    return f"{statistics.median(valores) * 1000:8.0f} ms (mín {min(valores) * 1000:.0f})"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--medir-dash":
+        print(medir_dash(sys.argv[2], sys.argv[3] == "1", float(sys.argv[4])))
+        sys.exit(0)
+
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--linhas", type=int, default=200_000, help="gastos sintéticos no banco")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--dash", action="store_true", help="mede também a primeira tela do dashboard")
+    ap.add_argument("--pausa", type=float, default=5.0, help="segundos na tela de login (--dash)")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_partida_")
+    db_path = os.path.join(tmp, "Gasto.db")
+    popular(db_path, args.linhas)
+    print(f"{args.linhas:,} gastos sintéticos em {db_path}")
+
+    payloads = gerar_payloads(11 * args.repeticoes * 2)
+    print(f"{'api':<12} | {'/health':>26} | {'1º POST':>26} | {'pior das 10 seguintes':>26}")
+    for k, preload in enumerate((False, True)):
+        medidas = [
+            medir_api(db_path, preload, args.workers, payloads[(k * args.repeticoes + i) * 11:][:11])
+            for i in range(args.repeticoes)
+        ]
+        h, p, m = zip(*medidas)
+        print(f"{'preload' if preload else 'sem preload':<12} | {_fmt(h)} | {_fmt(p)} | {_fmt(m)}")
+
+    if args.dash:
+        for aquecido in (False, True):
+            tempos = []
+            for _ in range(args.repeticoes):
+                # instantâneo apagado: cada rodada parte do mesmo estado frio
+                for arq in os.listdir(tmp):
+                    if arq.endswith(".gastos.arrow"):
+                        os.remove(os.path.join(tmp, arq))
+                r = subprocess.run(
+                    [sys.executable, "-m", "bench.bench_partida", "--medir-dash", db_path,
+                     "1" if aquecido else "0", str(args.pausa)],
+                    cwd=RAIZ, capture_output=True, text=True, check=True,
+                )
+                tempos.append(float(r.stdout.strip().splitlines()[-1]))
+            rotulo = f"aquecido ({args.pausa:.0f} s no login)" if aquecido else "frio"
+            print(f"dashboard, 1ª tela logada, {rotulo:<24}: {_fmt(tempos)}")
@@ -0,0 +1,142 @@
+"""Reprocessar categorias: loop antigo da Gerência x recategorizacao.py.
+
+Gera N gastos e K palavras-chave sintéticas (com acentos e maiúsculas), roda
+as duas versões em cópias do mesmo banco, confere que o resultado é idêntico
+linha a linha e falha (exit 1) se o ganho ficar abaixo do mínimo.
+
+O loop antigo é O(linhas × palavras) em normalizações; com `--amostra M` ele
+roda só nas M primeiras linhas e o tempo é extrapolado (é linear nas linhas);
+a conferência então vale para essas M linhas.
+
+Uso: python -m bench.bench_recategorizacao [--linhas 100000] [--palavras 1000] [--amostra 0] [--minimo 10]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from migracoes import migrar  # noqa: E402
+from normalizacao import normalizar_texto, tamanho_util  # noqa: E402
+from recategorizacao import recategorizar  # noqa: E402
+
+BLOQUEADAS = {"VERIFICAR", "Outros", "OUTROS"}
+ACENTOS = str.maketrans("aeiouc", "áêíõúç")
+
+
+def _palavra(rng):
+    p = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12)))
+    return p.translate(ACENTOS) if rng.random() < 0.2 else p
+
+
+def popular(caminho, n_linhas, n_palavras, semente=42):
+    rng = random.Random(semente)
+    conn = sqlite3.connect(caminho)
+    conn.isolation_level = None
+    conn.execute("PRAGMA journal_mode=WAL;")
+    migrar(conn)
+    conn.execute("BEGIN")
+    palavras = [_palavra(rng) for _ in range(n_palavras)]
+    conn.executemany(
+        "INSERT INTO Categorias (palavra_chave, palavra_norm, categoria) VALUES (?, ?, ?)",
+        [(p, normalizar_texto(p), f"Categoria {i % 80}") for i, p in enumerate(palavras)],
+    )
+    # lojas que se repetem, como nas notificações reais; ~60% contém uma palavra-chave
+    lojas = []
+    for _ in range(max(1, n_linhas // 30)):
+        loja = f"{_palavra(rng)} {_palavra(rng)}".upper()
+        if rng.random() < 0.6:
+            loja = f"{loja} {rng.choice(palavras).upper()} LTDA"
+        lojas.append(loja)
+    conn.executemany(
+        "INSERT INTO Gastos (data, valor, descricao, descricao_norm, usuario, categoria_id) VALUES (?, ?, ?, ?, ?, 1)",
+        (
+            ("2025-01-01 00:00:00", 10.0, loja, normalizar_texto(loja), "Pessoal")
+            for loja in (rng.choice(lojas) for _ in range(n_linhas))
+        ),
+    )
+    conn.execute("COMMIT")
+    conn.close()
+
+
+def _id_categoria(cur, nome):
+    cur.execute("INSERT OR IGNORE INTO NomesCategorias (nome) VALUES (?)", (nome,))
+    cur.execute("SELECT id FROM NomesCategorias WHERE nome = ?", (nome,))
+    return cur.fetchone()[0]
+
+
+def recategorizar_antigo(conn, limite=None):
+    """Como a Gerência fazia: normaliza cada palavra para cada linha, um UPDATE por linha."""
+    cur = conn.cursor()
+    cur.execute("SELECT palavra_chave, categoria FROM Categorias")
+    categorias = [(pk, cat) for pk, cat in cur.fetchall() if (cat not in BLOQUEADAS) and tamanho_util(pk) >= 4]
+    sql = "SELECT id, descricao, categoria FROM GastosDetalhados ORDER BY id"
+    cur.execute(sql + (f" LIMIT {int(limite)}" if limite else ""))
+    atualizados = 0
+    for gid, desc, cat_atual in cur.fetchall():
+        desc_norm = normalizar_texto(desc)
+        nova_cat = None
+        for palavra, cat in categorias:
+            if normalizar_texto(palavra) in desc_norm:
+                nova_cat = cat
+                break
+        if nova_cat and nova_cat != cat_atual:
+            cur.execute("UPDATE Gastos SET categoria_id = ? WHERE id = ?", (_id_categoria(cur, nova_cat), gid))
+            atualizados += 1
+    conn.commit()
+    return atualizados
+
+
+def _resultado(caminho, limite):
+    conn = sqlite3.connect(caminho)
+    sql = "SELECT id, categoria FROM GastosDetalhados ORDER BY id" + (f" LIMIT {int(limite)}" if limite else "")
+    linhas = conn.execute(sql).fetchall()
+    conn.close()
+    return linhas
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--linhas", type=int, default=100_000)
+    ap.add_argument("--palavras", type=int, default=1_000)
+    ap.add_argument("--amostra", type=int, default=0, help="linhas do loop antigo (0 = todas)")
+    ap.add_argument("--minimo", type=float, default=10.0, help="ganho mínimo exigido")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_recat_")
+    base = os.path.join(tmp, "base.db")
+    popular(base, args.linhas, args.palavras)
+    antigo_db, novo_db = os.path.join(tmp, "antigo.db"), os.path.join(tmp, "novo.db")
+    shutil.copy(base, antigo_db)
+    shutil.copy(base, novo_db)
+    print(f"{args.linhas:,} gastos × {args.palavras:,} palavras-chave")
+
+    amostra = args.amostra if 0 < args.amostra < args.linhas else None
+    conn = sqlite3.connect(antigo_db)
+    t0 = time.perf_counter()
+    n_antigo = recategorizar_antigo(conn, amostra)
+    t_antigo = (time.perf_counter() - t0) * (args.linhas / amostra if amostra else 1)
+    conn.close()
+
+    conn = sqlite3.connect(novo_db)
+    t0 = time.perf_counter()
+    examinadas, n_novo = recategorizar(conn, BLOQUEADAS)
+    conn.commit()
+    t_novo = time.perf_counter() - t0
+    conn.close()
+
+    iguais = _resultado(antigo_db, amostra) == _resultado(novo_db, amostra)
+    ganho = t_antigo / t_novo
+    rotulo = f" (extrapolado de {amostra:,} linhas)" if amostra else ""
+    print(f"antigo: {t_antigo:8.2f} s{rotulo} | {n_antigo:,} alterados")
+    print(f"novo  : {t_novo:8.2f} s | {examinadas:,} examinadas, {n_novo:,} alteradas")
+    print(f"ganho : {ganho:.0f}x | resultado idêntico: {'sim' if iguais else 'NÃO'}")
+    sys.exit(0 if iguais and ganho >= args.minimo else 1)
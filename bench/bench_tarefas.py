@@ -0,0 +1,130 @@
+"""Escritas da API durante o Reprocessar: transação única x tarefa em blocos (tarefas.py).
+
+Uma thread faz INSERTs em Gastos como a API (busy_timeout de 3 s, um por
+`--intervalo` ms) enquanto a recategorização roda em cópias do mesmo banco:
+inline, numa transação só (como a Gerência fazia), e como tarefa no worker,
+com commit por bloco. Mostra a espera das escritas (p50/p99/máx) e as que
+falharam; confere que as duas recategorizações dão o mesmo resultado e falha
+(exit 1) se alguma escrita falhar no modo tarefa.
+
+Uso: python -m bench.bench_tarefas [--linhas 200000] [--palavras 1000] [--intervalo 5]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import tarefas  # noqa: E402
+from bench.bench_recategorizacao import BLOQUEADAS, popular  # noqa: E402
+from recategorizacao import recategorizar  # noqa: E402
+
+
+class Escritor(threading.Thread):
+    """INSERTs periódicos em Gastos, medindo quanto cada um esperou pelo lock."""
+
+    def __init__(self, caminho, intervalo):
+        super().__init__(daemon=True)
+        self.caminho, self.intervalo = caminho, intervalo
+        self.esperas, self.falhas = [], 0
+        self.parar = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.caminho)
+        conn.execute("PRAGMA busy_timeout=3000;")
+        n = 0
+        while not self.parar.is_set():
+            n += 1
+            t0 = time.perf_counter()
+            try:
+                conn.execute(
+                    "INSERT INTO Gastos (data, valor, descricao, descricao_norm, usuario) VALUES (?, ?, ?, ?, ?)",
+                    ("2025-06-01 12:00:00", 1.0, f"BENCH {n}", f"bench {n}", "Pessoal"),
+                )
+                conn.commit()
+                self.esperas.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError:
+                conn.rollback()
+                self.falhas += 1
+            time.sleep(self.intervalo)
+        conn.close()
+
+
+def _inline(caminho):
+    conn = sqlite3.connect(caminho)
+    recategorizar(conn, BLOQUEADAS)
+    conn.commit()
+    conn.close()
+
+
+def _tarefa(caminho):
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA busy_timeout=10000;")
+    tarefas.enfileirar(conn, "recategorizar", bloqueadas=sorted(BLOQUEADAS))
+    conn.commit()
+    tarefa = tarefas._pegar(conn, "bench")
+    tarefas.executar(conn, tarefa, "bench")
+    estado = tarefas.listar(conn, ids=[tarefa["id"]])[0]["estado"]
+    conn.close()
+    return estado
+
+
+def medir(caminho, rodar, intervalo):
+    escritor = Escritor(caminho, intervalo)
+    escritor.start()
+    time.sleep(0.2)
+    t0 = time.perf_counter()
+    rodar(caminho)
+    duracao = time.perf_counter() - t0
+    escritor.parar.set()
+    escritor.join()
+    esperas = sorted(escritor.esperas) or [0.0]
+    pct = lambda p: esperas[min(len(esperas) - 1, int(p * len(esperas)))] * 1000  # noqa: E731
+    return duracao, len(esperas), escritor.falhas, pct(0.5), pct(0.99), esperas[-1] * 1000
+
+
+def _resultado(caminho):
+    conn = sqlite3.connect(caminho)
+    linhas = conn.execute(
+        "SELECT id, categoria_id FROM Gastos WHERE descricao NOT LIKE 'BENCH %' ORDER BY id"
+    ).fetchall()
+    conn.close()
+    return linhas
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--linhas", type=int, default=200_000)
+    ap.add_argument("--palavras", type=int, default=1_000)
+    ap.add_argument("--intervalo", type=float, default=5.0, help="ms entre escritas da 'API'")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_tarefas_")
+    base = os.path.join(tmp, "base.db")
+    popular(base, args.linhas, args.palavras)
+    print(f"{args.linhas:,} gastos × {args.palavras:,} palavras-chave; escrita a cada {args.intervalo:g} ms")
+
+    resultados = {}
+    falhas_tarefa = 0
+    for nome, rodar in (("inline", _inline), ("tarefa", _tarefa)):
+        caminho = os.path.join(tmp, f"{nome}.db")
+        shutil.copy(base, caminho)
+        duracao, n, falhas, p50, p99, maximo = medir(caminho, rodar, args.intervalo / 1000)
+        print(
+            f"{nome:6}: {duracao:6.2f} s | {n:,} escritas, {falhas} falha(s) | "
+            f"espera p50 {p50:6.1f} ms, p99 {p99:7.1f} ms, máx {maximo:7.1f} ms"
+        )
+        resultados[nome] = _resultado(caminho)
+        if nome == "tarefa":
+            falhas_tarefa = falhas
+
+    iguais = resultados["inline"] == resultados["tarefa"]
+    print(f"resultado idêntico: {'sim' if iguais else 'NÃO'}")
+    sys.exit(0 if iguais and not falhas_tarefa else 1)
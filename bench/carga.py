@@ -0,0 +1,270 @@
+"""Teste de carga do caminho de ingestão (/notificacaos).
+
+Roda contra um banco temporário (nunca o /data/Gasto.db) com uma mistura
+realista de mensagens: compras aprovadas dos dois bancos, recusadas, local
+não identificado e notificações que não são compra. Mede vazão e
+latência p50/p95/p99 por nível de concorrência:
+
+- `inprocess`: test client do Flask, sem rede (isola o custo da API);
+- `gunicorn`: um gunicorn local de verdade, via HTTP com keep-alive.
+
+O resultado vai para um JSON (com o commit atual) para comparar entre versões.
+
+Uso:
+    python -m bench.carga --modo ambos --concorrencia 1,10,50 --requisicoes 2000 \
+        --saida bench/resultados/carga.json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOCAIS = [
+    "PADARIA CENTRAL", "SUPERMERCADO GIASSI", "POSTO IPIRANGA", "IFOOD *RESTAURANTE",
+    "UBER *TRIP", "FARMACIA SAO JOAO", "STEAM GAMES", "MAGAZINE LUIZA", "AMAZON BR",
+]
+
+# (peso, gerador de payload)
+MISTURA = [
+    (45, lambda r, i: {
+        "titulo": "Compra aprovada",
+        "mensagem": f"Compra de R$ {r.randint(1, 900)},{r.randint(0, 99):02d} APROVADA em "
+                    f"{r.choice(LOCAIS)} para o cartão com final 1234",
+        "app": "com.nu.production",
+    }),
+    (30, lambda r, i: {
+        "titulo": "Compra aprovada",
+        "mensagem": f"Compra aprovada no valor de R$ {r.randint(1, 900)},{r.randint(0, 99):02d} "
+                    f"em {r.choice(LOCAIS)}.",
+        "app": "br.com.intermedium",
+    }),
+    (8, lambda r, i: {
+        "titulo": "Compra Recusada",
+        "mensagem": f"Compra de R$ {r.randint(1, 900)},00 RECUSADA em {r.choice(LOCAIS)}",
+        "app": "com.nu.production",
+    }),
+    (7, lambda r, i: {
+        "titulo": "Compra aprovada",
+        "mensagem": f"Pagamento de R$ {r.randint(1, 900)},00 processado",  # local não identificado
+        "app": "com.nu.production",
+    }),
+    (10, lambda r, i: {
+        "titulo": "Pix recebido",
+        "mensagem": f"Você recebeu R$ {r.randint(1, 900)},00",
+        "app": "br.com.intermedium",
+    }),
+]
+
+
+def gerar_payloads(n, semente=42, inicio=0):
+    r = random.Random(semente + inicio)
+    pesos = [p for p, _ in MISTURA]
+    geradores = [g for _, g in MISTURA]
+    payloads = []
+    for i in range(inicio, inicio + n):
+        p = r.choices(geradores, weights=pesos)[0](r, i)
+        # datas distintas: nenhuma requisição cai na supressão de duplicados
+        p["data"] = f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:{(i // 60) % 60:02d}.{i}"
+        payloads.append(p)
+    return payloads
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return None
+    k = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[k]
+
+
+def _resumo(modo, concorrencia, latencias, status, duracao):
+    latencias.sort()
+    return {
+        "modo": modo,
+        "concorrencia": concorrencia,
+        "requisicoes": len(latencias),
+        "duracao_s": round(duracao, 4),
+        "req_por_s": round(len(latencias) / duracao, 1) if duracao else None,
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "status": dict(Counter(status)),
+    }
+
+
+def _disparar(payloads, concorrencia, enviar_fabrica):
+    """Divide os payloads entre `concorrencia` threads; cada uma usa seu próprio cliente."""
+    latencias, status = [], []
+    trava = threading.Lock()
+    proximo = itertools.count()
+
+    def trabalhar():
+        enviar = enviar_fabrica()
+        locais_lat, locais_st = [], []
+        while True:
+            i = next(proximo)
+            if i >= len(payloads):
+                break
+            t0 = time.perf_counter()
+            codigo = enviar(payloads[i])
+            locais_lat.append((time.perf_counter() - t0) * 1000)
+            locais_st.append(codigo)
+        with trava:
+            latencias.extend(locais_lat)
+            status.extend(locais_st)
+
+    threads = [threading.Thread(target=trabalhar) for _ in range(concorrencia)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencias, status, time.perf_counter() - t0
+
+
+def rodar_inprocess(lotes, concorrencias, db_path):
+    os.environ["DB_PATH"] = db_path
+    sys.path.insert(0, RAIZ)
+    import main
+
+    main.print = lambda *a, **k: None  # silencia o log por requisição
+
+    def fabrica():
+        cliente = main.app.test_client()
+        return lambda p: cliente.post("/notificacaos", json=p).status_code
+
+    resultados = []
+    for c, payloads in zip(concorrencias, lotes):
+        lat, st, dur = _disparar(payloads, c, fabrica)
+        resultados.append(_resumo("inprocess", c, lat, st, dur))
+    return resultados
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_health(porta, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", porta, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("gunicorn não respondeu /health a tempo")
+
+
+def rodar_gunicorn(lotes, concorrencias, db_path, workers, threads):
+    porta = _porta_livre()
+    env = dict(os.environ, DB_PATH=db_path)
+    cmd = [
+        sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{porta}",
+        "-w", str(workers), "--threads", str(threads), "--log-level", "warning", "main:app",
+    ]
+    proc = subprocess.Popen(cmd, cwd=RAIZ, env=env, stdout=subprocess.DEVNULL)
+    try:
+        _esperar_health(porta)
+
+        def fabrica():
+            conn = http.client.HTTPConnection("127.0.0.1", porta, timeout=30)
+
+            def enviar(p):
+                corpo = json.dumps(p)
+                conn.request("POST", "/notificacaos", body=corpo,
+                             headers={"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+                return resp.status
+            return enviar
+
+        resultados = []
+        for c, payloads in zip(concorrencias, lotes):
+            lat, st, dur = _disparar(payloads, c, fabrica)
+            r = _resumo("gunicorn", c, lat, st, dur)
+            r["workers"], r["threads"] = workers, threads
+            resultados.append(r)
+        return resultados
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--modo", choices=["inprocess", "gunicorn", "ambos"], default="inprocess")
+    ap.add_argument("--concorrencia", default="1,10,50",
+                    help="níveis de concorrência separados por vírgula")
+    ap.add_argument("--requisicoes", type=int, default=2000, help="requisições por nível")
+    ap.add_argument("--workers", type=int, default=2, help="workers do gunicorn")
+    ap.add_argument("--threads", type=int, default=1, help="threads por worker do gunicorn")
+    ap.add_argument("--semente", type=int, default=42)
+    ap.add_argument("--saida", help="arquivo JSON de resultados (padrão: só imprime)")
+    args = ap.parse_args(argv)
+
+    concorrencias = [int(c) for c in args.concorrencia.split(",") if c.strip()]
+    # um lote por nível, com datas que não se repetem entre níveis
+    lotes = [
+        gerar_payloads(args.requisicoes, args.semente, inicio=k * args.requisicoes)
+        for k in range(len(concorrencias))
+    ]
+    tmp = tempfile.mkdtemp(prefix="bench_gastos_")
+
+    resultados = []
+    if args.modo in ("inprocess", "ambos"):
+        resultados += rodar_inprocess(lotes, concorrencias, os.path.join(tmp, "inprocess.db"))
+    if args.modo in ("gunicorn", "ambos"):
+        resultados += rodar_gunicorn(
+            lotes, concorrencias, os.path.join(tmp, "gunicorn.db"), args.workers, args.threads
+        )
+
+    relatorio = {
+        "commit": _commit(),
+        "quando": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "resultados": resultados,
+    }
+
+    print(f"{'modo':<10} | {'conc':>4} | {'req/s':>8} | {'p50':>7} | {'p95':>7} | {'p99':>7} | status")
+    for r in resultados:
+        print(f"{r['modo']:<10} | {r['concorrencia']:>4} | {r['req_por_s']:>8} | {r['p50_ms']:>7} | "
+              f"{r['p95_ms']:>7} | {r['p99_ms']:>7} | {r['status']}")
+
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"Resultados em {args.saida}")
+    return relatorio
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Índice de texto (FTS5, tokenizador trigram) sobre Gastos.descricao_norm.
+
+`GastosBusca` é uma tabela FTS5 de conteúdo externo (o texto fica só em
+Gastos; o índice guarda os trigramas) mantida por triggers, sobre a
+descrição já normalizada (sem acentos, minúsculas; normalizacao.py). Serve:
+- à aba "Pesquisar por descrição" da Gerência (trecho da descrição, sem
+  diferenciar acentos, resultados por relevância bm25, paginados);
+- à recategorização: as linhas que podem conter uma palavra-chave saem do
+  índice em vez de uma varredura de `LIKE '%palavra%'` na tabela toda.
+
+(A migração 9 criou o índice sobre `descricao`; a 10 o refaz sobre
+`descricao_norm`.)
+
+SQLite sem FTS5/trigram (< 3.34): a migração segue sem o índice e quem usa
+volta para a varredura.
+
+INSERT em lote (insercao_lote.py) não passa pelo trigger de INSERT: quem
+insere indexa as linhas novas de uma vez com `indexar_desde`.
+
+Uso manual:
+    python busca.py --reconstruir [--db /data/Gasto.db]
+"""
+
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+import insercao_lote
+from normalizacao import normalizar_texto
+
+TABELA = "GastosBusca"
+COLUNA = "descricao_norm"
+TAMANHO_MINIMO = 3  # trigram: termos menores não usam o índice
+TRIGGERS = ("trg_busca_insert", "trg_busca_delete", "trg_busca_update")
+
+
+def ddl(coluna=COLUNA):
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5(
+            {coluna}, content='Gastos', content_rowid='id', tokenize='trigram'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_insert AFTER INSERT ON Gastos
+        WHEN {insercao_lote.SEM_LOTE}
+        BEGIN
+            INSERT INTO {TABELA} (rowid, {coluna}) VALUES (NEW.id, NEW.{coluna});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_delete AFTER DELETE ON Gastos
+        BEGIN
+            INSERT INTO {TABELA} ({TABELA}, rowid, {coluna}) VALUES ('delete', OLD.id, OLD.{coluna});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_update AFTER UPDATE OF {coluna} ON Gastos
+        WHEN OLD.{coluna} IS NOT NEW.{coluna}
+        BEGIN
+            INSERT INTO {TABELA} ({TABELA}, rowid, {coluna}) VALUES ('delete', OLD.id, OLD.{coluna});
+            INSERT INTO {TABELA} (rowid, {coluna}) VALUES (NEW.id, NEW.{coluna});
+        END
+        """,
+    ]
+
+
+def criar(cur, coluna=COLUNA) -> bool:
+    """Cria a tabela FTS e os triggers; False se o SQLite não tem FTS5/trigram."""
+    insercao_lote.criar(cur)
+    try:
+        for comando in ddl(coluna):
+            cur.execute(comando)
+        return True
+    except sqlite3.OperationalError as e:
+        print(f"Busca por descrição sem índice (FTS5/trigram indisponível): {e}", flush=True)
+        return False
+
+
+def remover(cur):
+    for nome in TRIGGERS:
+        cur.execute(f"DROP TRIGGER IF EXISTS {nome}")
+    cur.execute(f"DROP TABLE IF EXISTS {TABELA}")
+
+
+def reconstruir(cur):
+    cur.execute(f"INSERT INTO {TABELA} ({TABELA}) VALUES ('rebuild')")
+
+
+def indexar_desde(cur, ultimo_id, coluna=COLUNA):
+    """Indexa as linhas de Gastos com id > `ultimo_id` (um INSERT em lote)."""
+    cur.execute(
+        f"INSERT INTO {TABELA} (rowid, {coluna}) SELECT id, {coluna} FROM Gastos WHERE id > ?",
+        (ultimo_id,),
+    )
+
+
+def disponivel(conn) -> bool:
+    r = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (TABELA,)).fetchone()
+    return r is not None
+
+
+def _frase(termo):
+    # frase entre aspas: no trigram casa como trecho (substring), sem sintaxe de consulta
+    return '"' + termo.replace('"', '""') + '"'
+
+
+def pesquisar(conn, termo, limite=25, deslocamento=0):
+    """(página de gastos cuja descrição contém o termo, total), por relevância.
+
+    Sem diferenciar acentos nem maiúsculas. Termos curtos demais para o
+    índice (ou banco sem índice) vão por LIKE.
+    """
+    colunas = "g.id, g.data, g.categoria, g.valor, g.descricao, g.usuario"
+    termo = normalizar_texto(termo)
+    if len(termo) >= TAMANHO_MINIMO and disponivel(conn):
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM {TABELA} WHERE {TABELA} MATCH ?", (_frase(termo),)
+        ).fetchone()[0]
+        df = pd.read_sql_query(
+            f"""
+            SELECT {colunas}
+              FROM {TABELA} b
+              JOIN GastosDetalhados g ON g.id = b.rowid
+             WHERE {TABELA} MATCH ?
+             ORDER BY b.rank, g.id DESC
+             LIMIT ? OFFSET ?
+            """,
+            conn,
+            params=(_frase(termo), limite, deslocamento),
+        )
+    else:
+        padrao = "%" + termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM Gastos WHERE {COLUNA} LIKE ? ESCAPE '\\'", (padrao,)
+        ).fetchone()[0]
+        df = pd.read_sql_query(
+            f"""
+            SELECT {colunas}
+              FROM Gastos t
+              JOIN GastosDetalhados g ON g.id = t.id
+             WHERE t.{COLUNA} LIKE ? ESCAPE '\\'
+             ORDER BY t.id DESC
+             LIMIT ? OFFSET ?
+            """,
+            conn,
+            params=(padrao, limite, deslocamento),
+        )
+    return df, total
+
+
+def candidatos(conn, palavras, tabela_temp="candidatos"):
+    """Preenche temp.<tabela_temp>(id) com os gastos que podem conter alguma palavra.
+
+    Palavras já normalizadas (sem acento, minúsculas). Devolve False, sem
+    criar nada, quando o índice não serve (sem FTS ou palavra curta demais).
+    Chamada fora de transação, não deixa uma aberta: a leitura das candidatas
+    não pode ficar segurando um snapshot até o primeiro UPDATE (com outra
+    conexão escrevendo no meio, ele falharia com "database is locked").
+    """
+    if not disponivel(conn) or any(len(p) < TAMANHO_MINIMO for p in palavras):
+        return False
+    em_transacao = conn.in_transaction
+    conn.execute(f"DROP TABLE IF EXISTS temp.{tabela_temp}")
+    conn.execute(f"CREATE TEMP TABLE {tabela_temp} (id INTEGER PRIMARY KEY)")
+    for p in palavras:
+        conn.execute(
+            f"INSERT OR IGNORE INTO temp.{tabela_temp} (id) SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH ?",
+            (_frase(p),),
+        )
+    # linhas gravadas sem a forma normalizada (idx_gastos_descricao_norm acha direto)
+    conn.execute(
+        f"INSERT OR IGNORE INTO temp.{tabela_temp} (id) SELECT id FROM Gastos WHERE {COLUNA} IS NULL"
+    )
+    if not em_transacao:
+        conn.commit()  # só tabela temporária foi escrita
+    return True
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Índice FTS5 de Gastos.descricao_norm.")
+    ap.add_argument("--db", default=os.environ.get("DB_PATH", "/data/Gasto.db"))
+    ap.add_argument("--reconstruir", action="store_true", help="refaz o índice a partir de Gastos")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.reconstruir:
+        if criar(conn.cursor()):
+            reconstruir(conn.cursor())
+            conn.commit()
+            print(f"{TABELA} reconstruído.")
+    else:
+        print(f"{TABELA}: {'presente' if disponivel(conn) else 'ausente'}")
+    conn.close()
@@ -0,0 +1,70 @@
+"""Cache LRU limitado por tamanho (bytes), seguro entre threads.
+
+Usado pelo dashboard para guardar figuras e agregados já montados, com a
+versão dos dados na chave: quando o banco muda as chaves antigas deixam de
+ser pedidas e saem pelo LRU. O tamanho de cada item é medido uma vez, na
+inserção (por padrão, o pickle serializado).
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def tamanho_pickle(valor) -> int:
+    return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class CacheLRU:
+    def __init__(self, max_bytes, medir=tamanho_pickle):
+        self.max_bytes = max_bytes
+        self._medir = medir
+        self._itens = OrderedDict()  # chave -> (valor, bytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+    def obter(self, chave, fabrica):
+        """Valor da chave; na falta, chama `fabrica()` e guarda o resultado.
+
+        A fábrica roda fora do lock: duas sessões pedindo a mesma chave ao mesmo
+        tempo podem montar o valor duas vezes, mas nenhuma espera pela outra.
+        """
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[0]
+            self.falhas += 1
+
+        valor = fabrica()
+        tamanho = self._medir(valor)
+        with self._lock:
+            if tamanho > self.max_bytes:
+                return valor  # maior que o cache inteiro: não guarda
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self.bytes -= antigo[1]
+            self._itens[chave] = (valor, tamanho)
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                _, (_, t) = self._itens.popitem(last=False)
+                self.bytes -= t
+                self.despejos += 1
+        return valor
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "despejos": self.despejos,
+                "taxa_acerto": self.acertos / total if total else None,
+            }
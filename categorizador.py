@@ -0,0 +1,95 @@
+"""Casamento de palavras-chave por automato (Aho-Corasick).
+
+Usado para achar a categoria de uma descrição sem varrer a tabela
+Categorias inteira a cada gasto.
+"""
+
+from collections import deque
+
+from normalizacao import CATEGORIAS_BLOQUEADAS, TAMANHO_MINIMO, normalizar_texto, palavra_valida
+
+
+class Automato:
+    """Automato de Aho-Corasick sobre palavras-chave.
+
+    `palavras` é uma sequência de (palavra, valor) na ordem de prioridade:
+    quando várias palavras aparecem no texto, vence a que veio primeiro
+    (mesmo resultado do loop antigo `for palavra in ...: if palavra in texto`).
+    """
+
+    def __init__(self, palavras):
+        self._goto = [{}]
+        self._fail = [0]
+        self._saida = [None]  # menor ordem de palavra que termina no nó
+        self._valores = []
+        self._vazia = None  # palavra "" casa com qualquer texto
+
+        for ordem, (palavra, valor) in enumerate(palavras):
+            self._valores.append(valor)
+            if not palavra:
+                if self._vazia is None:
+                    self._vazia = ordem
+                continue
+            no = 0
+            for ch in palavra:
+                prox = self._goto[no].get(ch)
+                if prox is None:
+                    prox = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._saida.append(None)
+                    self._goto[no][ch] = prox
+                no = prox
+            if self._saida[no] is None:
+                self._saida[no] = ordem
+
+        # Links de falha em largura; a saída de cada nó herda a do link
+        fila = deque(self._goto[0].values())
+        while fila:
+            no = fila.popleft()
+            for ch, prox in self._goto[no].items():
+                fila.append(prox)
+                f = self._fail[no]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[prox] = self._goto[f].get(ch, 0)
+                herdada = self._saida[self._fail[prox]]
+                if herdada is not None and (
+                    self._saida[prox] is None or herdada < self._saida[prox]
+                ):
+                    self._saida[prox] = herdada
+
+    def __len__(self):
+        return len(self._valores)
+
+    def primeiro(self, texto: str):
+        """Valor da palavra de menor ordem contida em `texto` (ou None)."""
+        goto, fail, saida = self._goto, self._fail, self._saida
+        melhor = self._vazia
+        no = 0
+        for ch in texto:
+            while no and ch not in goto[no]:
+                no = fail[no]
+            no = goto[no].get(ch, 0)
+            s = saida[no]
+            if s is not None and (melhor is None or s < melhor):
+                melhor = s
+                if melhor == 0:
+                    break
+        return None if melhor is None else self._valores[melhor]
+
+
+def montar_automato(cur, bloqueadas=CATEGORIAS_BLOQUEADAS, tamanho_minimo=TAMANHO_MINIMO):
+    """Automato (palavra normalizada -> nome da categoria) de Categorias, na ordem de id.
+
+    Na Gerência só entram as palavras válidas (normalizacao.palavra_valida);
+    com `bloqueadas=None` (a API) entram todas as palavras-chave. Linha sem
+    `palavra_norm` é normalizada aqui.
+    """
+    cur.execute("SELECT palavra_chave, palavra_norm, categoria FROM Categorias ORDER BY id")
+    return Automato(
+        (pn if pn is not None else normalizar_texto(pk), cat)
+        for pk, pn, cat in cur.fetchall()
+        if pk is not None
+        and (bloqueadas is None or palavra_valida(pk, cat, bloqueadas, tamanho_minimo))
+    )
@@ -0,0 +1,221 @@
+"""Consultas agregadas do dashboard.
+
+Os filtros da barra lateral viram um WHERE parametrizado e as métricas e
+gráficos saem prontos de um GROUP BY; só os agregados chegam ao pandas.
+Tudo que não precisa de linha individual lê de ResumoMensal (ver
+resumo_mensal.py), que tem uma linha por mês × usuário × categoria.
+
+O frame linha a linha (histórico) sai de `gastos()` já compacto: lido em
+blocos, com texto repetido como categoria e inteiros de 32 bits, para caber
+folgado na VM de 512 MB do dashboard.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import versoes
+
+SQL_GASTOS = (
+    "SELECT id, data_epoch, mes, categoria_id, categoria, valor, descricao, usuario FROM GastosDetalhados"
+)
+COLUNAS_CATEGORIA = ("mes", "categoria", "descricao", "usuario")
+LINHAS_POR_BLOCO = 20_000
+
+
+def filtros_resumo(usuario=None, categoria_id=None, mes=None):
+    """(trecho WHERE, parâmetros) sobre as chaves de ResumoMensal; None = sem filtro."""
+    conds, params = [], []
+    if usuario is not None:
+        conds.append("usuario = ?")
+        params.append(usuario)
+    if categoria_id is not None:
+        conds.append("categoria_id = ?")
+        params.append(int(categoria_id))
+    if mes is not None:
+        conds.append("mes = ?")
+        params.append(mes)
+    return (" WHERE " + " AND ".join(conds)) if conds else "", params
+
+
+def existe_gasto(conn) -> bool:
+    return conn.execute("SELECT EXISTS (SELECT 1 FROM Gastos)").fetchone()[0] == 1
+
+
+def versao_dados(conn):
+    """Versão de Gastos e NomesCategorias (versoes.py): muda a cada INSERT (id novo),
+    UPDATE/DELETE e renomeação; serve de chave para caches de agregados."""
+    return versoes.versao(conn, "Gastos", "NomesCategorias")
+
+
+def usuarios(conn):
+    cur = conn.execute("SELECT DISTINCT usuario FROM ResumoMensal WHERE usuario <> '' ORDER BY usuario")
+    return [r[0] for r in cur.fetchall()]
+
+
+def categorias(conn) -> pd.DataFrame:
+    """Categorias com pelo menos um gasto (id, nome), em ordem de nome."""
+    return pd.read_sql_query(
+        """
+        SELECT n.id, n.nome
+          FROM NomesCategorias n
+         WHERE EXISTS (SELECT 1 FROM ResumoMensal r WHERE r.categoria_id = n.id)
+         ORDER BY n.nome
+        """,
+        conn,
+    )
+
+
+def meses(conn):
+    """Meses (YYYY-MM) com gastos."""
+    cur = conn.execute(
+        "SELECT DISTINCT mes FROM ResumoMensal WHERE mes GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]' ORDER BY mes"
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def resumo(conn, **filtros):
+    """(total, média, quantidade) dos gastos filtrados."""
+    where, params = filtros_resumo(**filtros)
+    centavos, qtd_valor, qtd = conn.execute(
+        f"SELECT SUM(soma_centavos), SUM(qtd_valor), SUM(qtd) FROM ResumoMensal{where}", params
+    ).fetchone()
+    total = (centavos or 0) / 100
+    media = total / qtd_valor if qtd_valor else None
+    return total, media, qtd or 0
+
+
+def por_categoria(conn, **filtros) -> pd.DataFrame:
+    """Soma por categoria (agrupa pelo id; o nome entra só no resultado)."""
+    where, params = filtros_resumo(**filtros)
+    return pd.read_sql_query(
+        f"""
+        SELECT a.categoria_id, n.nome AS categoria, a.centavos / 100.0 AS valor
+          FROM (SELECT categoria_id, SUM(soma_centavos) AS centavos
+                  FROM ResumoMensal{where}
+                 GROUP BY categoria_id) a
+          JOIN NomesCategorias n ON n.id = a.categoria_id
+         ORDER BY a.centavos DESC
+        """,
+        conn,
+        params=params,
+    )
+
+
+def por_mes(conn, **filtros) -> pd.DataFrame:
+    where, params = filtros_resumo(**filtros)
+    where += (" AND" if where else " WHERE") + " mes GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]'"
+    return pd.read_sql_query(
+        f"""
+        SELECT mes, SUM(soma_centavos) / 100.0 AS valor
+          FROM ResumoMensal{where}
+         GROUP BY mes
+         ORDER BY mes
+        """,
+        conn,
+        params=params,
+    )
+
+
+def _compactar(df):
+    """Tipos enxutos para um bloco recém-lido (data vem do epoch, sem parse de texto)."""
+    df.insert(1, "data", pd.to_datetime(df.pop("data_epoch"), unit="s"))
+    df["id"] = df["id"].astype("int32")
+    df["categoria_id"] = df["categoria_id"].astype("Int32")
+    df["valor"] = df["valor"].astype("float64")  # float32 mostraria 12.3400001 na tabela
+    for c in COLUNAS_CATEGORIA:
+        df[c] = df[c].astype("category")
+    return df
+
+
+def concatenar(partes):
+    """Junta frames de `gastos()` mantendo as colunas categóricas (une as categorias)."""
+    partes = [p for p in partes if not p.empty] or partes[:1]
+    if len(partes) == 1:
+        return partes[0]
+    colunas = {}
+    for c in partes[0].columns:
+        if c in COLUNAS_CATEGORIA:
+            colunas[c] = union_categoricals([p[c] for p in partes])
+        else:
+            colunas[c] = pd.concat([p[c] for p in partes], ignore_index=True)
+    return pd.DataFrame(colunas, copy=False)
+
+
+def gastos(conn, desde_id=0, linhas_por_bloco=LINHAS_POR_BLOCO) -> pd.DataFrame:
+    """Gastos com id > desde_id, em ordem de id, lidos em blocos já compactados."""
+    blocos = pd.read_sql_query(
+        f"{SQL_GASTOS} WHERE id > ? ORDER BY id", conn, params=(desde_id,), chunksize=linhas_por_bloco
+    )
+    partes = [_compactar(b) for b in blocos]
+    if not partes:
+        partes = [_compactar(pd.read_sql_query(f"{SQL_GASTOS} LIMIT 0", conn))]
+    return concatenar(partes)
+
+
+# HISTÓRICO PAGINADO
+# Paginação por chave (keyset) sobre o frame de `gastos()`, que está em ordem de id:
+# a próxima página começa depois da (data, id) da última linha mostrada, então
+# linhas novas ou apagadas não deslocam as páginas. Só a página vai para o navegador.
+ORDENACOES = {
+    "Mais recentes": ("data", False),
+    "Mais antigas": ("data", True),
+    "ID (maior primeiro)": ("id", False),
+    "ID (menor primeiro)": ("id", True),
+}
+
+
+def _data_ns(df):
+    # datetime64[ns] como inteiro; NaT vira o menor int64 (fica antes de tudo)
+    return df["data"].to_numpy("datetime64[ns]").view("int64")
+
+
+def ordem_por_data(df):
+    """Posições do frame em ordem de (data, id) crescente; sem data vem antes."""
+    return np.argsort(_data_ns(df), kind="stable")
+
+
+def pagina(df, tamanho, ordenacao="Mais recentes", apos=None, busca=None, ordem_data=None):
+    """(linhas da página, cursor da última linha, tem_mais).
+
+    `apos` é o cursor devolvido pela página anterior (None = primeira página);
+    `busca` filtra descrições sem diferenciar maiúsculas; `ordem_data` é o
+    resultado de `ordem_por_data(df)`, se já calculado.
+    """
+    coluna, crescente = ORDENACOES[ordenacao]
+    if coluna == "id":
+        seq = np.arange(len(df))
+    else:
+        seq = ordem_data if ordem_data is not None else ordem_por_data(df)
+    if not crescente:
+        seq = seq[::-1]
+
+    if busca:
+        cats = df["descricao"].cat.categories
+        achadas = np.flatnonzero(cats.str.contains(busca, case=False, regex=False, na=False))
+        codigos = df["descricao"].cat.codes.to_numpy()
+        seq = seq[np.isin(codigos[seq], achadas)]
+
+    ids = df["id"].to_numpy()[seq]
+    if apos is not None:
+        k, id_ = apos
+        if coluna == "id":
+            depois = ids > id_ if crescente else ids < id_
+        else:
+            chave = _data_ns(df)[seq]
+            if crescente:
+                depois = (chave > k) | ((chave == k) & (ids > id_))
+            else:
+                depois = (chave < k) | ((chave == k) & (ids < id_))
+        inicio = int(depois.argmax()) if depois.any() else len(seq)
+    else:
+        inicio = 0
+
+    posicoes = seq[inicio:inicio + tamanho]
+    linhas = df.iloc[posicoes]
+    cursor = None
+    if len(posicoes):
+        ultima = posicoes[-1]
+        k = int(df["id"].iat[ultima]) if coluna == "id" else int(_data_ns(df)[ultima])
+        cursor = (k, int(df["id"].iat[ultima]))
+    return linhas, cursor, inicio + tamanho < len(seq)
@@ -0,0 +1,38 @@
+"""Normalização das datas dos gastos, feita uma vez na gravação.
+
+Gastos guarda a data em três formas prontas para uso:
+- `data`: texto ISO fixo 'YYYY-MM-DD HH:MM:SS' (ordena como data);
+- `data_epoch`: segundos desde 1970 do mesmo horário de parede (sem fuso),
+  que o dashboard converte direto para datetime64;
+- `mes`: 'YYYY-MM'.
+
+Aceita o que o celular manda: 'T' ou espaço, segundos opcionais, fração de
+segundo e sufixo de fuso (descartado: vale o horário mostrado no aparelho).
+"""
+
+import re
+from datetime import datetime, timezone
+
+RE_DATA = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2}))?(?:[.,]\d+)?)?"
+    r"\s*(?:Z|[+-]\d{2}:?\d{2})?$"
+)
+
+
+def normalizar_data(valor):
+    """(iso, epoch, mes) da data recebida, ou None se não for uma data válida."""
+    m = RE_DATA.match(str(valor).strip())
+    if not m:
+        return None
+    try:
+        dt = datetime(*(int(g) if g else 0 for g in m.groups()))
+    except ValueError:  # mês 13, dia 31 de fevereiro...
+        return None
+    epoch = int(dt.replace(tzinfo=timezone.utc).timestamp())
+    return dt.strftime("%Y-%m-%d %H:%M:%S"), epoch, dt.strftime("%Y-%m")
+
+
+def agora():
+    """Data atual já normalizada (para notificação sem data)."""
+    return normalizar_data(datetime.now().isoformat(sep=" ", timespec="seconds"))
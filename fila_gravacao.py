@@ -0,0 +1,148 @@
+"""Fila de gravação com commit em grupo (write-behind) para a API.
+
+Os handlers enfileiram as linhas já interpretadas; uma thread dedicada
+junta o que chegar (até `max_lote` itens ou `atraso` segundos) e grava
+tudo numa única transação com a função `gravar(conn, lista_de_params)`.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+_PARAR = object()
+
+
+class Pedido:
+    """Confirmação de um item enfileirado; `aguardar()` espera o commit."""
+
+    def __init__(self, params, ao_concluir=None):
+        self.params = params
+        self.erro = None
+        self._ao_concluir = ao_concluir
+        self._evento = threading.Event()
+
+    def concluir(self, erro=None):
+        self.erro = erro
+        if self._ao_concluir is not None:
+            try:
+                self._ao_concluir(erro)
+            except Exception as e:
+                print(f"Erro no retorno do item gravado: {e}", flush=True)
+        self._evento.set()
+
+    def aguardar(self, timeout=None) -> bool:
+        """True se o item foi gravado; False se falhou ou estourou o timeout."""
+        return self._evento.wait(timeout) and self.erro is None
+
+
+class GravadorEmLote:
+    def __init__(self, abrir_conexao, gravar, max_lote=200, atraso=0.005, tentativas=3):
+        self._abrir_conexao = abrir_conexao
+        self._gravar_lote = gravar
+        self._max_lote = max_lote
+        self._atraso = atraso
+        self._tentativas = tentativas
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="gravador-gastos", daemon=True)
+        self._conn = None
+        self._parado = False
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def enfileirar(self, params, ao_concluir=None) -> Pedido:
+        """`ao_concluir(erro)` roda na thread do gravador quando o lote do item
+        termina (erro None: gravado), mesmo que ninguém esteja aguardando."""
+        if self._parado:
+            raise RuntimeError("Gravador já foi encerrado")
+        if not self._thread.is_alive():
+            raise RuntimeError("Thread do gravador parou")
+        pedido = Pedido(params, ao_concluir)
+        self._fila.put(pedido)
+        return pedido
+
+    def pendentes(self) -> int:
+        return self._fila.qsize()
+
+    def vivo(self) -> bool:
+        return self._thread.is_alive()
+
+    def descartar_pendentes(self, erro):
+        """Conclui com `erro` o que ficou na fila (gravador cuja thread morreu)."""
+        while True:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _PARAR:
+                item.concluir(erro)
+
+    def parar(self, timeout=None):
+        """Encerra a thread depois de gravar tudo que já estava na fila."""
+        if self._parado:
+            return
+        self._parado = True
+        self._fila.put(_PARAR)
+        self._thread.join(timeout)
+
+    def _loop(self):
+        encerrar = False
+        while not encerrar:
+            item = self._fila.get()
+            if item is _PARAR:
+                break
+            lote = [item]
+            limite = time.monotonic() + self._atraso
+            while len(lote) < self._max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _PARAR:
+                    encerrar = True
+                    break
+                lote.append(item)
+            self._gravar(lote)
+        # drena o que sobrou (itens enfileirados depois do sinal de parada)
+        resto = []
+        while True:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _PARAR:
+                resto.append(item)
+        if resto:
+            self._gravar(resto)
+        if self._conn is not None:
+            self._conn.close()
+
+    def _gravar(self, lote):
+        erro = None
+        for tentativa in range(self._tentativas):
+            try:
+                if self._conn is None:
+                    self._conn = self._abrir_conexao()
+                with self._conn:
+                    self._gravar_lote(self._conn, [p.params for p in lote])
+                erro = None
+                break
+            except Exception as e:
+                erro = e
+                print(f"Erro ao gravar lote ({len(lote)} itens, tentativa {tentativa + 1}): {e}", flush=True)
+                try:
+                    if self._conn is not None:
+                        self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+                if not isinstance(e, sqlite3.Error):
+                    break  # erro de programa, não de banco: tentar de novo não adianta
+                time.sleep(0.05 * (tentativa + 1))
+        # todo item do lote é concluído (com o erro, se houver): quem aguarda
+        # responde e a impressão reservada é liberada
+        for p in lote:
+            p.concluir(erro)
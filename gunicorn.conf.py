@@ -0,0 +1,20 @@
+"""Configuração do gunicorn da API (fly.toml: `gunicorn -c gunicorn.conf.py main:app`).
+
+Com `preload_app` o master importa main.py uma vez (imports, migrações e
+aquecimento do automato e do LRU de impressões) e os workers nascem por fork
+já com esse estado, em vez de cada um repetir a partida a frio.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+preload_app = True
+# workers/threads: padrão do gunicorn, ou WEB_CONCURRENCY / GUNICORN_CMD_ARGS no ambiente
+
+
+def pre_fork(server, worker):
+    # A conexão SQLite aberta no master não pode ser usada do outro lado do fork;
+    # fecha antes, e cada worker abre a sua no primeiro conectar()
+    import main
+
+    main.descartar_conexao()
@@ -0,0 +1,28 @@
+"""Marca de INSERT em lote em Gastos, que adia os triggers de INSERT por linha.
+
+Os triggers de INSERT do resumo (resumo_mensal.py) e do índice de busca
+(busca.py) rodam uma vez por linha; num lote eles custam mais que o próprio
+INSERT. Enquanto `InsercaoEmLote` tiver uma linha eles não rodam (`SEM_LOTE`
+é a condição WHEN deles), e quem marcou faz, para todas as linhas novas de
+uma vez, o mesmo trabalho (`resumo_mensal.somar_desde`, `busca.indexar_desde`;
+ver `main.inserir_gastos`).
+
+A marca é gravada e apagada dentro da transação de quem insere, então
+nenhuma outra conexão a vê; se algo falhar no meio, o rollback de quem chama
+a desfaz junto com o lote.
+"""
+
+TABELA = "InsercaoEmLote"
+SEM_LOTE = f"NOT EXISTS (SELECT 1 FROM {TABELA})"
+
+
+def criar(cur):
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {TABELA} (marca INTEGER)")
+
+
+def marcar(cur):
+    cur.execute(f"INSERT INTO {TABELA} (marca) VALUES (1)")
+
+
+def desmarcar(cur):
+    cur.execute(f"DELETE FROM {TABELA}")
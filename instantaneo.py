@@ -0,0 +1,167 @@
+"""Instantâneo colunar (Arrow IPC) do frame de gastos, guardado ao lado do banco.
+
+Na partida a frio o dashboard mapeia o arquivo em memória em vez de reler e
+converter todas as linhas do SQLite; do banco só vem o delta (id acima do
+último gravado no arquivo).
+
+Consistência: o arquivo guarda a versão de `Gastos_reescritas`, o maior id
+e o user_version de quando foi gerado. A leitura acontece numa única
+transação de leitura do SQLite (WAL): se a versão de reescritas ainda é a
+mesma, nenhuma linha do arquivo mudou nem foi apagada e, como os ids só
+crescem, o delta `id > max_id` completa exatamente o banco naquele instante.
+Se mudou (UPDATE/DELETE, renomeação, migração), lê tudo do banco e regrava.
+
+Compactação: quando o delta passa de `LIMITE_DELTA` linhas o frame inteiro é
+regravado (arquivo temporário + os.replace, atômico para quem está lendo).
+
+Uso manual:
+    python instantaneo.py --compactar [--db /data/Gasto.db]
+    python instantaneo.py --conferir
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+import consultas
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # sem pyarrow: o dashboard lê tudo do SQLite, como antes
+    pa = None
+
+LIMITE_DELTA = 5_000
+CHAVE_META = b"gastos_instantaneo"
+
+
+def caminho_para(db_path):
+    return os.path.splitext(db_path)[0] + ".gastos.arrow"
+
+
+def _versoes(conn):
+    r = conn.execute("SELECT versao FROM Versoes WHERE tabela = 'Gastos_reescritas'").fetchone()
+    return {
+        "reescritas": r[0] if r else None,
+        "esquema": conn.execute("PRAGMA user_version").fetchone()[0],
+    }
+
+
+def ler(caminho):
+    """(frame, metadados) do arquivo, mapeado em memória; None se não houver."""
+    if pa is None or not os.path.exists(caminho):
+        return None
+    try:
+        # sem fechar o mapa: colunas numéricas do frame apontam direto para ele
+        tabela = pa.ipc.open_file(pa.memory_map(caminho)).read_all()
+        meta = json.loads(tabela.schema.metadata[CHAVE_META])
+        return tabela.to_pandas(split_blocks=True), meta
+    except (OSError, KeyError, ValueError, pa.ArrowException) as e:
+        print(f"Instantâneo ignorado ({caminho}): {e}", flush=True)
+        return None
+
+
+def gravar(df, caminho, versoes, max_id):
+    """Grava o frame com os metadados de consistência (troca atômica do arquivo)."""
+    if pa is None:
+        return False
+    meta = dict(versoes, max_id=int(max_id), linhas=len(df))
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    tabela = tabela.replace_schema_metadata(
+        {**(tabela.schema.metadata or {}), CHAVE_META: json.dumps(meta).encode()}
+    )
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(tmp, "wb") as f:
+            with pa.ipc.new_file(f, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, caminho)
+        return True
+    except OSError as e:  # volume só leitura, disco cheio...: segue sem instantâneo
+        print(f"Não foi possível gravar o instantâneo ({caminho}): {e}", flush=True)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def _vale(conn, meta, versoes):
+    """O arquivo corresponde a este banco? Versões iguais e mesma contagem até max_id
+    (a contagem pega a troca do arquivo do banco por outro com as mesmas versões)."""
+    if versoes["reescritas"] is None or any(meta.get(k) != v for k, v in versoes.items()):
+        return False
+    n = conn.execute("SELECT COUNT(*) FROM Gastos WHERE id <= ?", (meta["max_id"],)).fetchone()[0]
+    return n == meta["linhas"]
+
+
+def carregar(conn, caminho, limite_delta=LIMITE_DELTA):
+    """(frame, versão de reescritas, maior id) — instantâneo + delta, ou tudo do banco.
+
+    Regrava o instantâneo quando ele estava inválido ou o delta ficou grande.
+    """
+    conn.execute("BEGIN")  # uma só visão do banco para versões, instantâneo e delta
+    try:
+        versoes = _versoes(conn)
+        lido = ler(caminho)
+        base = None
+        if lido is not None:
+            df_arq, meta = lido
+            if _vale(conn, meta, versoes):
+                base = df_arq
+        if base is not None:
+            delta = consultas.gastos(conn, desde_id=meta["max_id"])
+            df = consultas.concatenar([base, delta])
+            compactar = len(delta) >= limite_delta
+        else:
+            df = consultas.gastos(conn)
+            compactar = True
+    finally:
+        conn.execute("COMMIT")
+
+    max_id = int(df["id"].max()) if not df.empty else 0
+    if compactar and versoes["reescritas"] is not None:
+        gravar(df, caminho, versoes, max_id)
+    return df, versoes["reescritas"], max_id
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Instantâneo colunar de Gastos.")
+    ap.add_argument("--db", default=os.environ.get("DB_PATH", "/data/Gasto.db"))
+    grupo = ap.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--compactar", action="store_true", help="regrava o arquivo a partir do banco")
+    grupo.add_argument("--conferir", action="store_true", help="compara instantâneo + delta com o banco")
+    args = ap.parse_args()
+
+    caminho = caminho_para(args.db)
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    if args.compactar:
+        conn.execute("BEGIN")
+        versoes = _versoes(conn)
+        df = consultas.gastos(conn)
+        conn.execute("COMMIT")
+        ok = gravar(df, caminho, versoes, int(df["id"].max()) if not df.empty else 0)
+        print(f"{caminho}: {len(df):,} linhas" if ok else "Falhou.")
+    else:
+        conn.execute("BEGIN")
+        versoes = _versoes(conn)
+        lido = ler(caminho)
+        if lido is None:
+            print("Sem instantâneo.")
+        elif not _vale(conn, lido[1], versoes):
+            print(f"Instantâneo desatualizado ({lido[1]} x banco {versoes}); será regravado na próxima carga.")
+        else:
+            df = consultas.concatenar([lido[0], consultas.gastos(conn, desde_id=lido[1]["max_id"])])
+            banco = consultas.gastos(conn)
+            try:
+                pd.testing.assert_frame_equal(df, banco, check_categorical=False)
+                print(f"Instantâneo + delta iguais ao banco ({len(banco):,} linhas).")
+            except AssertionError as e:
+                print(f"DIFERENTE do banco:\n{e}")
+        conn.execute("COMMIT")
+    conn.close()
@@ -0,0 +1,76 @@
+"""Interpretadores de mensagem por app de origem (banco).
+
+Cada interpretador devolve (valor, descricao, status) numa passada só, com
+regex compiladas no carregamento do módulo. `status` é "aprovada",
+"recusada" ou None quando a mensagem não diz. Mensagens fora do formato
+conhecido do banco caem no interpretador genérico (as regex antigas).
+"""
+
+import re
+
+_VALOR = r"(?P<valor>\d{1,7}(?:\.\d{3})*,\d{2})"
+_LOCAL = r"(?P<local>[\wÀ-ÿ\s&._*-]+?)(?=(?:[.,\-:]|\bpara\b|$))"
+
+# Genérico: mesmas regex usadas desde a primeira versão da API
+RE_VALOR = re.compile(r"R\$ ?" + _VALOR)
+RE_LOCAL = re.compile(r"em\s+" + _LOCAL, re.IGNORECASE)
+RE_RECUSADA = re.compile(r"\brecusada\b", re.IGNORECASE)
+
+# Nubank: "Compra de R$ 23,90 APROVADA em PADARIA CENTRAL para o cartão com final 1234"
+RE_NUBANK = re.compile(
+    r"^Compra de R\$ ?" + _VALOR + r" (?P<status>APROVADA|RECUSADA) em\s+" + _LOCAL,
+    re.IGNORECASE,
+)
+
+# Inter: "Compra aprovada no valor de R$ 50,00 em LOJA X." / "Compra recusada no valor de ..."
+RE_INTER = re.compile(
+    r"^Compra (?P<status>aprovada|recusada) no valor de R\$ ?" + _VALOR + r" em\s+" + _LOCAL,
+    re.IGNORECASE,
+)
+
+INTERPRETADORES = {}
+
+
+def registrar(*apps):
+    def decorador(fn):
+        for app in apps:
+            INTERPRETADORES[app] = fn
+        return fn
+    return decorador
+
+
+def _valor_br(txt):
+    return float(txt.replace(".", "").replace(",", "."))
+
+
+def _do_match(m):
+    return _valor_br(m.group("valor")), m.group("local").strip(), m.group("status").lower()
+
+
+def interpretar_generico(mensagem):
+    padrao_valor = RE_VALOR.search(mensagem)
+    valor = _valor_br(padrao_valor.group("valor")) if padrao_valor else None
+
+    # Extrai o local (palavra após "em")
+    padrao_local = RE_LOCAL.search(mensagem)
+    descricao = padrao_local.group("local").strip() if padrao_local else "Nao identificado"
+
+    status = "recusada" if RE_RECUSADA.search(mensagem) else None
+    return valor, descricao, status
+
+
+@registrar("com.nu.production")
+def interpretar_nubank(mensagem):
+    m = RE_NUBANK.match(mensagem)
+    return _do_match(m) if m else interpretar_generico(mensagem)
+
+
+@registrar("br.com.intermedium")
+def interpretar_inter(mensagem):
+    m = RE_INTER.match(mensagem)
+    return _do_match(m) if m else interpretar_generico(mensagem)
+
+
+def interpretar_mensagem(app_origem, mensagem):
+    """Escolhe o interpretador pelo app de origem (genérico se não houver)."""
+    return INTERPRETADORES.get(app_origem, interpretar_generico)(mensagem or "")
@@ -1,23 +1,101 @@
-from flask import Flask, request, jsonify
-import sys, re, os, unicodedata
-from datetime import datetime
+import time
+_INICIO = time.perf_counter()  # perfil de partida: conta desde antes dos imports
+
+from flask import Flask, request, jsonify, g
+import sys, os, threading, atexit, hashlib
+from collections import OrderedDict
 import sqlite3
 
+from categorizador import montar_automato
+from datas import normalizar_data, agora
+from fila_gravacao import GravadorEmLote
+from interpretadores import interpretar_mensagem
+from migracoes import migrar
+from normalizacao import TAMANHO_MINIMO, normalizar_texto, tamanho_util
+import busca
+import insercao_lote
+import metricas
+import resumo_mensal
+from metricas import cronometro
+
+_FIM_IMPORTS = time.perf_counter()
+
 # Desativa buffering globalmente (para log ao vivo no Fly)
 sys.stdout.reconfigure(line_buffering=True)
 
-DB_PATH = "/data/Gasto.db"
+DB_PATH = os.environ.get("DB_PATH", "/data/Gasto.db")
+
+# Modo opcional: handlers enfileiram e uma thread grava em grupo (ver fila_gravacao.py)
+GRAVACAO_EM_LOTE = os.environ.get("GRAVACAO_EM_LOTE", "0") == "1"
+TIMEOUT_AGUARDAR = 10  # segundos esperando o commit quando o cliente pede "aguardar"
 
 app = Flask(__name__)
 
+# Métricas por worker expostas em /metrics (ver metricas.py)
+ETAPA = "gastos_etapa_segundos"
+NOTIFICACOES = "gastos_notificacoes_total"
+metricas.descrever(ETAPA, "histogram", "Tempo por etapa do processamento de notificações.")
+metricas.descrever("gastos_requisicao_segundos", "histogram", "Tempo total da requisição por rota.")
+metricas.descrever(NOTIFICACOES, "counter", "Notificações por resultado (salvo, ignorado, recusada, duplicado, enfileirado, falha).")
+metricas.descrever("gastos_categorias_criadas_total", "counter", "Categorias criadas automaticamente pela API.")
+metricas.descrever("gastos_partida_segundos", "histogram", "Etapas da partida do processo (imports, migracoes, aquecimento, primeira_requisicao).")
+
+# Perfil de partida: as etapas sempre vão para /metrics; com PERFIL_PARTIDA=1 também para o log
+PERFIL_PARTIDA = os.environ.get("PERFIL_PARTIDA", "0") == "1"
+
+
+def _marcar_partida(etapa, segundos):
+    metricas.observar("gastos_partida_segundos", segundos, etapa=etapa)
+    if PERFIL_PARTIDA:
+        print(f"[partida pid={os.getpid()}] {etapa}: {segundos * 1000:.1f} ms", flush=True)
+
+
+_marcar_partida("imports", _FIM_IMPORTS - _INICIO)
+
 # Conexao BD
-def conectar():
-    os.makedirs("/data", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+# Cada worker (e cada thread, no servidor de dev) mantém uma conexão aberta;
+# os PRAGMAs e o makedirs só rodam quando ela é (re)aberta.
+_local = threading.local()
+
+
+def _abrir_conexao():
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA busy_timeout=3000;")
     return conn
 
+
+def conectar():
+    conn = getattr(_local, "conn", None)
+    # Conexão herdada de outro processo (fork do gunicorn) não é reaproveitada
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+    conn = _abrir_conexao()
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+def descartar_conexao():
+    """Fecha a conexão do worker; a próxima chamada a conectar() reabre."""
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def conexao_saudavel() -> bool:
+    try:
+        conectar().execute("SELECT 1").fetchone()
+        return True
+    except sqlite3.Error:
+        descartar_conexao()
+        return False
+
 # Identifica o usuário com base no app.
 def user(datau: str) -> str:
     mapping = {
@@ -29,79 +107,88 @@ def user(datau: str) -> str:
 
 
 def criar_ou_atualizar_tabela():
-    """Cria tabelas, se ainda não existirem."""
-    with conectar() as conn:
-        cur = conn.cursor()
-
-        # Tabela principal de gastos
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS Gastos (
-            data TEXT,
-            categoria TEXT,
-            valor REAL,
-            descricao TEXT,
-            usuario TEXT
-        )
-        """)
-
-        # Tabela de categorias com mapeamento de palavras-chave
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS Categorias (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            palavra_chave TEXT UNIQUE,
-            categoria TEXT
-        )
-        """)
-        cur.execute("""
-        CREATE TRIGGER IF NOT EXISTS trg_categoria_delete
-            AFTER DELETE ON Categorias
-            BEGIN
-            UPDATE Gastos
-            SET categoria = 'VERIFICAR'
-            WHERE categoria = OLD.categoria;
-            END;
-            """)
-        conn.commit()
+    """Aplica as migrações pendentes (ver migracoes.py); sem DDL se o banco já estiver em dia."""
+    migrar(conectar())
 
+_t = time.perf_counter()
 criar_ou_atualizar_tabela()
+_marcar_partida("migracoes", time.perf_counter() - _t)
 
 # CATEGORIZAÇÃO AUTOMÁTICA
 
-def _tamanho_util(txt: str) -> int:
-    if not txt:
-        return 0
-    return sum(ch.isalnum() for ch in txt)
-
-
-def identificar_categoria(descricao):    
-    # Identifica a categoria de um gasto com base na descrição.
+# Automato de palavras-chave em memória (um por worker).
+# Só é reconstruído quando a versão de Categorias muda; categorias criadas
+# pelo próprio worker entram em "extras" (checadas depois, pois têm id maior).
+_cache_categorias = {"versao": None, "automato": None, "extras": []}
+MAX_EXTRAS = 64
+
+
+def _versao_categorias(cur):
+    cur.execute("SELECT versao FROM Versoes WHERE tabela = 'Categorias'")
+    r = cur.fetchone()
+    return r[0] if r else None
+
+
+def _buscar_categoria(cur, descricao_norm):
+    versao = _versao_categorias(cur)
+    cache = _cache_categorias
+    if (
+        cache["automato"] is None
+        or versao is None
+        or versao != cache["versao"]
+        or len(cache["extras"]) > MAX_EXTRAS
+    ):
+        # todas as palavras-chave; o filtro de bloqueadas/curtas é só do Reprocessar da Gerência
+        cache["automato"] = montar_automato(cur, bloqueadas=None)
+        cache["versao"] = versao
+        cache["extras"] = []
+
+    cat = cache["automato"].primeiro(descricao_norm)
+    if cat is not None:
+        return cat
+    for palavra, cat in cache["extras"]:
+        if palavra in descricao_norm:
+            return cat
+    return None
+
+
+def identificar_categoria(descricao, descricao_norm=None):
+    # Identifica a categoria de um gasto com base na descrição (comparada já normalizada,
+    # a mesma forma que fica em Gastos.descricao_norm e que a Gerência usa).
     # Se não houver correspondência, cria uma nova categoria automaticamente.
     
-    descricao_lower = descricao.lower()
+    if descricao_norm is None:
+        descricao_norm = normalizar_texto(descricao)
     with conectar() as conn:
         cur = conn.cursor()
         
-        if _tamanho_util(descricao) < 4:
+        if tamanho_util(descricao) < TAMANHO_MINIMO:
             return "VERIFICAR"        
 
-        # Busca categorias existentes
-        cur.execute("SELECT palavra_chave, categoria FROM Categorias")
-        categorias = cur.fetchall()
-
-        # Tenta encontrar uma correspondência
-        for palavra, cat in categorias:
-            if palavra.lower() in descricao_lower: 
-                return cat
+        # Tenta encontrar uma correspondência (primeira palavra-chave vence)
+        cat = _buscar_categoria(cur, descricao_norm)
+        if cat is not None:
+            return cat
 
 
         # Se não encontrou, cria uma nova categoria baseada na descrição
         nova_cat = descricao.strip().title() 
+        palavra_norm = normalizar_texto(nova_cat)
         try:
             cur.execute("""
-                INSERT OR IGNORE INTO Categorias (palavra_chave, categoria)
-                VALUES (?, ?)
-            """, (nova_cat.lower(), nova_cat))
+                INSERT OR IGNORE INTO Categorias (palavra_chave, palavra_norm, categoria)
+                VALUES (?, ?, ?)
+            """, (nova_cat.lower(), palavra_norm, nova_cat))
+            criada = cur.rowcount > 0
+            versao = _versao_categorias(cur) if criada else None
             conn.commit()
+            if criada:
+                metricas.incrementar("gastos_categorias_criadas_total")
+            # Se só a nossa inserção mudou a tabela, evita reconstruir o automato
+            cache = _cache_categorias
+            if versao is not None and cache["versao"] is not None and versao == cache["versao"] + 1:
+                cache["extras"].append((palavra_norm, nova_cat))
+                cache["versao"] = versao
             print(f"Nova categoria criada: {nova_cat}", flush=True)
         except Exception as e:
             print(f"Erro ao criar nova categoria: {e}", flush=True)
@@ -109,21 +196,167 @@ def identificar_categoria(descricao):
         return nova_cat
 
 
+@app.before_request
+def _iniciar_cronometro():
+    g.t0 = time.perf_counter()
+
+
+_primeira_requisicao = {"pendente": True}
+
+
+@app.after_request
+def _medir_requisicao(resposta):
+    t0 = g.get("t0")
+    if t0 is not None and request.endpoint:
+        metricas.observar("gastos_requisicao_segundos", time.perf_counter() - t0, rota=request.endpoint)
+    if _primeira_requisicao["pendente"]:
+        # com preload_app, _INICIO é a partida do master (o worker nasce por fork)
+        _primeira_requisicao["pendente"] = False
+        _marcar_partida("primeira_requisicao", time.perf_counter() - _INICIO)
+    return resposta
+
+
+@app.teardown_request
+def _reconectar_apos_erro(exc):
+    # Erro de banco não tratado: descarta a conexão para reabrir na próxima
+    if isinstance(exc, sqlite3.Error) and not isinstance(exc, sqlite3.IntegrityError):
+        descartar_conexao()
+
+
 @app.route('/')
 def home():
     return "API Gastos online"
 
+
+@app.route('/metrics')
+def metrics():
+    return metricas.exportar(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+@app.route('/health')
+def health():
+    if conexao_saudavel():
+        return jsonify({"status": "ok"}), 200
+    return jsonify({"status": "erro", "motivo": "Banco indisponível"}), 503
+
 # @app.route('/dashboard')
 # def dashboard():
 #     # Redireciona para o Streamlit (ajuste a URL se mudar a porta)
 #     return redirect("")
 
-@app.route('/notificacaos', methods=['POST'])
-def receber_notificacao():
-    data = request.get_json(silent=True)
-    if not data:
-        return jsonify({"erro": "Nenhum JSON válido recebido"}), 400
-
+SQL_INSERT_NOME = "INSERT OR IGNORE INTO NomesCategorias (nome) VALUES (?)"
+SQL_INSERT_GASTO = """
+    INSERT OR IGNORE INTO Gastos (data, categoria_id, valor, descricao, usuario, impressao, data_epoch, mes, descricao_norm)
+    VALUES (?, (SELECT id FROM NomesCategorias WHERE nome = ?), ?, ?, ?, ?, ?, ?, ?)
+"""
+MAX_LOTE = 500
+LINHAS_LOTE_ADIADO = 10  # abaixo disso os triggers por linha saem mais baratos
+
+_gravador = {"pid": None, "gravador": None}
+_gravador_lock = threading.Lock()
+
+
+def gravador():
+    # Um gravador por worker, criado no primeiro uso (depois do fork do gunicorn)
+    # e recriado se a thread dele morreu; o lock evita dois gravadores por worker
+    with _gravador_lock:
+        atual = _gravador["gravador"]
+        if _gravador["pid"] == os.getpid() and atual is not None and atual.vivo():
+            return atual
+        if _gravador["pid"] == os.getpid() and atual is not None:
+            atual.descartar_pendentes(RuntimeError("gravador em lote parou"))
+        novo = GravadorEmLote(_abrir_conexao, inserir_gastos).iniciar()
+        _gravador["gravador"] = novo
+        _gravador["pid"] = os.getpid()
+        atexit.register(novo.parar)
+        return novo
+
+
+# DUPLICADOS
+# O listener do Android às vezes entrega a mesma compra duas vezes. Cada worker
+# guarda as impressões recentes (LRU) para responder sem tocar no banco; o índice
+# único idx_gastos_impressao é a garantia durável.
+MAX_IMPRESSOES = 10000
+_impressoes = {"aquecido": False, "lru": OrderedDict()}
+# Com GRAVACAO_EM_LOTE: impressões enfileiradas e ainda não gravadas. Barram a
+# duplicata que chega antes do flush; só passam para o LRU depois do commit e
+# saem daqui se o lote falhar (a nova tentativa do cliente é aceita).
+_impressoes_em_voo = set()
+_impressoes_lock = threading.Lock()
+
+
+def impressao_gasto(data_envio, valor, descricao, usuario):
+    # Sem data não dá para distinguir duas compras iguais; não deduplica
+    if not data_envio:
+        return None
+    chave = "\x1f".join(str(x) if x is not None else "" for x in (data_envio, valor, descricao, usuario))
+    return hashlib.blake2b(chave.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _lru_impressoes():
+    if not _impressoes["aquecido"]:
+        # Aquece com as últimas impressões gravadas (no aquecimento ou no primeiro uso);
+        # com preload_app os workers herdam o LRU já cheio do master
+        lru = OrderedDict()
+        cur = conectar().execute(
+            "SELECT impressao FROM Gastos WHERE impressao IS NOT NULL ORDER BY rowid DESC LIMIT ?",
+            (MAX_IMPRESSOES,),
+        )
+        for (imp,) in reversed(cur.fetchall()):
+            lru[imp] = None
+        _impressoes["lru"] = lru
+        _impressoes["aquecido"] = True
+    return _impressoes["lru"]
+
+
+def impressao_conhecida(impressao) -> bool:
+    if impressao is None:
+        return False
+    with _impressoes_lock:
+        if impressao in _impressoes_em_voo:
+            return True
+        lru = _lru_impressoes()
+        if impressao in lru:
+            lru.move_to_end(impressao)
+            return True
+        return False
+
+
+def _lembrar(impressao):
+    lru = _lru_impressoes()
+    lru[impressao] = None
+    lru.move_to_end(impressao)
+    while len(lru) > MAX_IMPRESSOES:
+        lru.popitem(last=False)
+
+
+def lembrar_impressao(impressao):
+    if impressao is None:
+        return
+    with _impressoes_lock:
+        _lembrar(impressao)
+
+
+def reservar_impressao(impressao):
+    """Marca a impressão como em voo; devolve o retorno para o gravador em lote,
+    que a lembra se o item foi gravado e a libera se o lote falhou."""
+    if impressao is None:
+        return None
+    with _impressoes_lock:
+        _impressoes_em_voo.add(impressao)
+
+    def concluir(erro):
+        with _impressoes_lock:
+            _impressoes_em_voo.discard(impressao)
+            if erro is None:
+                _lembrar(impressao)
+
+    return concluir
+
+
+def interpretar_notificacao(data):
+    # Aplica os filtros de título, o interpretador do banco e o mapeamento de usuário.
+    # Retorna (registro, None) ou (None, resposta) quando a notificação é ignorada.
     titulo = data.get ("titulo", "")
     mensagem = data.get("mensagem", "")   
     app_origem = data.get("app", "")
@@ -131,42 +364,139 @@ def receber_notificacao():
     
     if "Compra" not in titulo :
         print(f"Ignorado: título '{titulo}' não é uma compra aprovada.", flush=True)
-        return jsonify({"status": "ignorado", "motivo": "Título não corresponde a compra"}), 200
+        metricas.incrementar(NOTIFICACOES, resultado="ignorado")
+        return None, {"status": "ignorado", "motivo": "Título não corresponde a compra"}
 
     if "Recusada" in titulo :
         print(f"Ignorado: título '{titulo}' é uma compra recusada.", flush=True)
-        return jsonify({"status": "ignorado", "motivo": "Titulo de compra recusada"}), 200
-
+        metricas.incrementar(NOTIFICACOES, resultado="recusada")
+        return None, {"status": "ignorado", "motivo": "Titulo de compra recusada"}
+
+    # Data gravada já no formato fixo (datas.py); sem data, vale a hora do servidor
+    if data_envio:
+        data_norm = normalizar_data(data_envio)
+        if data_norm is None:
+            print(f"Recusado: data inválida '{data_envio}'.", flush=True)
+            metricas.incrementar(NOTIFICACOES, resultado="falha")
+            return None, {"erro": f"Data inválida: '{data_envio}'"}
+    else:
+        data_norm = agora()
 
     usuario = user(app_origem)
 
+    # Valor, local e status numa passada, com o interpretador do banco (interpretadores.py)
+    with cronometro(ETAPA, etapa="interpretar"):
+        valor, descricao, status = interpretar_mensagem(app_origem, mensagem)
+    if status == "recusada":
+        print(f"Ignorado: mensagem de compra recusada em '{descricao}'.", flush=True)
+        metricas.incrementar(NOTIFICACOES, resultado="recusada")
+        return None, {"status": "ignorado", "motivo": "Mensagem de compra recusada"}
+
+    with cronometro(ETAPA, etapa="duplicado"):
+        # sobre a data como veio do celular (a fração de segundo, se houver, conta)
+        impressao = impressao_gasto(data_envio, valor, descricao, usuario)
+        duplicado = impressao_conhecida(impressao)
+    if duplicado:
+        print(f"Ignorado: duplicado de '{descricao}' em {data_envio}.", flush=True)
+        metricas.incrementar(NOTIFICACOES, resultado="duplicado")
+        return None, {"status": "duplicado"}
     
-    padrao_valor = re.search(r"R\$ ?(\d{1,7}(?:\.\d{3})*,\d{2})", mensagem)
-    valor = float(padrao_valor.group(1).replace(".", "").replace(",", ".")) if padrao_valor else None
-
-    # Extrai o local (palavra após "em")
-    padrao_local = re.search(r"em\s+([\wÀ-ÿ\s&._*-]+?)(?=(?:[.,\-:]|\bpara\b|$))", mensagem, re.IGNORECASE)
-    descricao = padrao_local.group(1).strip() if padrao_local else "Nao identificado"
-    
-    # Identifica (ou cria) categoria com base na descrição
-    categoria = identificar_categoria(descricao)
+    # Identifica (ou cria) categoria com base na descrição, normalizada uma vez aqui
+    with cronometro(ETAPA, etapa="categorizar"):
+        descricao_norm = normalizar_texto(descricao)
+        categoria = identificar_categoria(descricao, descricao_norm)
 
+    data_iso, data_epoch, mes = data_norm
     registro = {
-        "data": data_envio,
+        "data": data_iso,
         "categoria": categoria,
         "valor": valor,
         "descricao": descricao,
-        "usuario": usuario
+        "usuario": usuario,
+        "impressao": impressao,
+        "data_epoch": data_epoch,
+        "mes": mes,
+        "descricao_norm": descricao_norm,
     }
+    return registro, None
+
+
+def inserir_gastos(conn, lista_params):
+    # Garante o nome da categoria em NomesCategorias e grava os gastos (FK por id).
+    # Retorna quantos gastos entraram (duplicados são ignorados pelo índice único).
+    # Lote: resumo mensal e índice de busca atualizados uma vez, não por linha
+    # (insercao_lote.py); precisa rodar numa transação só, como os chamadores fazem.
+    nomes = {(p[1],) for p in lista_params if p[1] is not None}
+    conn.executemany(SQL_INSERT_NOME, nomes)
+    if len(lista_params) < LINHAS_LOTE_ADIADO:
+        return conn.executemany(SQL_INSERT_GASTO, lista_params).rowcount
+    # ids AUTOINCREMENT: as linhas deste lote são as de id maior que o atual
+    ultimo = conn.execute("SELECT IFNULL(MAX(id), 0) FROM Gastos").fetchone()[0]
+    insercao_lote.marcar(conn)
+    n = conn.executemany(SQL_INSERT_GASTO, lista_params).rowcount
+    if n > 0:
+        resumo_mensal.somar_desde(conn, ultimo)
+        if busca.disponivel(conn):
+            busca.indexar_desde(conn, ultimo)
+    insercao_lote.desmarcar(conn)
+    return n
+
+
+def _params_registro(registro):
+    return (registro["data"], registro["categoria"], registro["valor"], registro["descricao"], registro["usuario"], registro["impressao"],
+            registro["data_epoch"], registro["mes"], registro["descricao_norm"])
+
+
+@app.route('/notificacaos', methods=['POST'])
+def receber_notificacao():
+    with cronometro(ETAPA, etapa="json"):
+        data = request.get_json(silent=True)
+    if not data:
+        metricas.incrementar(NOTIFICACOES, resultado="falha")
+        return jsonify({"erro": "Nenhum JSON válido recebido"}), 400
+
+    registro, resposta = interpretar_notificacao(data)
+    if resposta is not None:
+        return jsonify(resposta), 400 if "erro" in resposta else 200
+
+    if GRAVACAO_EM_LOTE:
+        # em voo desde já (barra a duplicata que chegar antes do flush); só vai
+        # para o LRU quando o lote for gravado
+        concluir = reservar_impressao(registro["impressao"])
+        try:
+            pedido = gravador().enfileirar(_params_registro(registro), ao_concluir=concluir)
+        except RuntimeError as e:  # gravador encerrado ou com a thread morta
+            if concluir is not None:
+                concluir(e)
+            metricas.incrementar(NOTIFICACOES, resultado="falha")
+            return jsonify({"erro": f"Falha ao salvar no banco: {e}"}), 503
+        aguardar = request.args.get("aguardar") == "1" or data.get("aguardar") is True
+        if not aguardar:
+            metricas.incrementar(NOTIFICACOES, resultado="enfileirado")
+            return jsonify({"status": "enfileirado"}), 202
+        with cronometro(ETAPA, etapa="gravar"):
+            gravado = pedido.aguardar(TIMEOUT_AGUARDAR)
+        if gravado:
+            print("Registro salvo:", registro, flush=True)
+            metricas.incrementar(NOTIFICACOES, resultado="salvo")
+            return jsonify({"status": "ok"}), 200
+        print("Erro ao salvar:", pedido.erro or "timeout", flush=True)
+        metricas.incrementar(NOTIFICACOES, resultado="falha")
+        return jsonify({"erro": f"Falha ao salvar no banco: {pedido.erro or 'timeout'}"}), 500
 
     try:
         with conectar() as conn:
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO Gastos (data, categoria, valor, descricao, usuario)
-                VALUES (?, ?, ?, ?, ?)
-            """, (registro["data"], registro["categoria"], registro["valor"], registro["descricao"], registro["usuario"]))
-            conn.commit()
+            # separa a espera pelo lock de escrita do SQLite do insert em si
+            with cronometro(ETAPA, etapa="lock"):
+                conn.execute("BEGIN IMMEDIATE")
+            with cronometro(ETAPA, etapa="gravar"):
+                inserido = inserir_gastos(conn, [_params_registro(registro)]) > 0
+                conn.commit()
+        lembrar_impressao(registro["impressao"])
+        if not inserido:
+            print("Ignorado: duplicado já gravado:", registro, flush=True)
+            metricas.incrementar(NOTIFICACOES, resultado="duplicado")
+            return jsonify({"status": "duplicado"}), 200
 
         #     # Busca os 3 últimos registros
         #     cur.execute("""
@@ -182,13 +512,100 @@ def receber_notificacao():
         # ]
 
         print("Registro salvo:", registro, flush=True)
+        metricas.incrementar(NOTIFICACOES, resultado="salvo")
         return jsonify({"status": "ok"}), 200
 
     except Exception as e:
+        if isinstance(e, sqlite3.Error) and not isinstance(e, sqlite3.IntegrityError):
+            descartar_conexao()
         print("Erro ao salvar:", e, flush=True)
+        metricas.incrementar(NOTIFICACOES, resultado="falha")
         return jsonify({"erro": f"Falha ao salvar no banco: {e}"}), 500
 
 
+@app.route('/notificacaos/batch', methods=['POST'])
+def receber_notificacoes_lote():
+    # Recebe uma lista de notificações (ex.: reenvio após o celular ficar offline)
+    # e grava todas as aceitas numa única transação.
+    with cronometro(ETAPA, etapa="json"):
+        itens = request.get_json(silent=True)
+    if not isinstance(itens, list) or not itens:
+        return jsonify({"erro": "Esperada uma lista JSON de notificações"}), 400
+    if len(itens) > MAX_LOTE:
+        return jsonify({"erro": f"Lote maior que o limite de {MAX_LOTE} itens"}), 413
+
+    resultados = []
+    aceitos = []  # (posição no lote, registro)
+    vistas = set()
+    for i, item in enumerate(itens):
+        if not isinstance(item, dict) or not item:
+            metricas.incrementar(NOTIFICACOES, resultado="falha")
+            resultados.append({"erro": "Item não é um JSON válido"})
+            continue
+        registro, resposta = interpretar_notificacao(item)
+        if resposta is not None:
+            resultados.append(resposta)
+            continue
+        if registro["impressao"] is not None and registro["impressao"] in vistas:
+            metricas.incrementar(NOTIFICACOES, resultado="duplicado")
+            resultados.append({"status": "duplicado"})
+            continue
+        vistas.add(registro["impressao"])
+        resultados.append(None)
+        aceitos.append((i, registro))
+
+    if aceitos:
+        try:
+            with conectar() as conn:
+                # IMMEDIATE: ninguém grava entre a checagem de duplicados e o insert
+                with cronometro(ETAPA, etapa="lock"):
+                    conn.execute("BEGIN IMMEDIATE")
+                impressoes = [r["impressao"] for _, r in aceitos if r["impressao"] is not None]
+                ja_gravadas = set()
+                if impressoes:
+                    marcadores = ",".join("?" * len(impressoes))
+                    ja_gravadas = {imp for (imp,) in conn.execute(
+                        f"SELECT impressao FROM Gastos WHERE impressao IN ({marcadores})", impressoes
+                    )}
+                novos = [(i, r) for i, r in aceitos if r["impressao"] not in ja_gravadas]
+                with cronometro(ETAPA, etapa="gravar"):
+                    inserir_gastos(conn, [_params_registro(r) for _, r in novos])
+            for i, r in aceitos:
+                resultados[i] = {"status": "duplicado"} if r["impressao"] in ja_gravadas else {"status": "ok"}
+                lembrar_impressao(r["impressao"])
+            metricas.incrementar(NOTIFICACOES, len(novos), resultado="salvo")
+            metricas.incrementar(NOTIFICACOES, len(aceitos) - len(novos), resultado="duplicado")
+            aceitos = novos
+            print(f"Lote salvo: {len(aceitos)} de {len(itens)} registros", flush=True)
+        except Exception as e:
+            if isinstance(e, sqlite3.Error) and not isinstance(e, sqlite3.IntegrityError):
+                descartar_conexao()
+            print("Erro ao salvar lote:", e, flush=True)
+            metricas.incrementar(NOTIFICACOES, len(aceitos), resultado="falha")
+            for i, _ in aceitos:
+                resultados[i] = {"erro": f"Falha ao salvar no banco: {e}"}
+            return jsonify({"status": "erro", "salvos": 0, "itens": resultados}), 500
+
+    return jsonify({"status": "ok", "salvos": len(aceitos), "itens": resultados}), 200
+
+
+
+
+def aquecer():
+    """Monta o automato de categorias e o LRU de impressões antes da primeira requisição.
+
+    Com `preload_app` (gunicorn.conf.py) roda uma vez no master e os workers
+    herdam o estado pronto; sem preload, cada worker aquece ao importar.
+    """
+    _t = time.perf_counter()
+    with conectar() as conn:
+        _buscar_categoria(conn.cursor(), "")
+    with _impressoes_lock:
+        _lru_impressoes()
+    _marcar_partida("aquecimento", time.perf_counter() - _t)
+
+
+aquecer()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,108 @@
+"""Métricas leves da API (histogramas e contadores) em formato Prometheus.
+
+Cada worker do gunicorn tem as próprias métricas; `/metrics` responde com
+as do worker que atendeu (a série `gastos_worker_info` traz o pid).
+Custo por observação: um perf_counter, um bisect e um lock.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Limites dos buckets em segundos (de 0,1 ms a 5 s)
+LIMITES = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_lock = threading.Lock()
+_histogramas = {}  # (nome, ((rótulo, valor), ...)) -> [contagens..., soma, total]
+_contadores = {}   # (nome, ((rótulo, valor), ...)) -> valor
+_ajuda = {}        # nome -> (tipo, texto)
+
+
+def descrever(nome, tipo, texto):
+    _ajuda[nome] = (tipo, texto)
+
+
+def observar(nome, segundos, **rotulos):
+    chave = (nome, tuple(sorted(rotulos.items())))
+    i = bisect_left(LIMITES, segundos)
+    with _lock:
+        h = _histogramas.get(chave)
+        if h is None:
+            h = _histogramas[chave] = [0] * (len(LIMITES) + 1) + [0.0, 0]
+        h[i] += 1
+        h[-2] += segundos
+        h[-1] += 1
+
+
+def incrementar(nome, valor=1, **rotulos):
+    chave = (nome, tuple(sorted(rotulos.items())))
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+class cronometro:
+    """`with cronometro("gastos_etapa_segundos", etapa="json"):` mede o bloco."""
+
+    __slots__ = ("nome", "rotulos", "t0")
+
+    def __init__(self, nome, **rotulos):
+        self.nome = nome
+        self.rotulos = rotulos
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observar(self.nome, time.perf_counter() - self.t0, **self.rotulos)
+        return False
+
+
+def _rotulos(pares, extra=None):
+    itens = list(pares) + ([extra] if extra else [])
+    if not itens:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in itens) + "}"
+
+
+def _numero(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def exportar() -> str:
+    """Texto no formato de exposição do Prometheus (0.0.4)."""
+    with _lock:
+        histogramas = {k: list(v) for k, v in _histogramas.items()}
+        contadores = dict(_contadores)
+
+    linhas = [
+        "# HELP gastos_worker_info Worker que respondeu este scrape.",
+        "# TYPE gastos_worker_info gauge",
+        f'gastos_worker_info{{pid="{os.getpid()}"}} 1',
+    ]
+    cabecalhos = set()
+
+    def cabecalho(nome, tipo_padrao):
+        if nome in cabecalhos:
+            return
+        cabecalhos.add(nome)
+        tipo, texto = _ajuda.get(nome, (tipo_padrao, nome))
+        linhas.append(f"# HELP {nome} {texto}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+
+    for (nome, pares), valor in sorted(contadores.items()):
+        cabecalho(nome, "counter")
+        linhas.append(f"{nome}{_rotulos(pares)} {_numero(valor)}")
+
+    for (nome, pares), h in sorted(histogramas.items()):
+        cabecalho(nome, "histogram")
+        acumulado = 0
+        for limite, n in zip(LIMITES, h):
+            acumulado += n
+            linhas.append(f"{nome}_bucket{_rotulos(pares, ('le', limite))} {acumulado}")
+        linhas.append(f"{nome}_bucket{_rotulos(pares, ('le', '+Inf'))} {h[-1]}")
+        linhas.append(f"{nome}_sum{_rotulos(pares)} {_numero(h[-2])}")
+        linhas.append(f"{nome}_count{_rotulos(pares)} {h[-1]}")
+
+    return "\n".join(linhas) + "\n"
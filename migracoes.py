@@ -0,0 +1,384 @@
+"""Migrações versionadas do banco (PRAGMA user_version).
+
+Cada migração é uma função que recebe o cursor e leva o esquema da versão
+N-1 para a N. `migrar()` lê o user_version e, se já estiver na última
+versão, volta sem rodar DDL nenhum (partida a quente). Caso contrário,
+pega o lock de escrita do banco, confere a versão de novo (outro worker
+pode ter migrado enquanto esperava) e aplica só o que falta.
+"""
+
+import sqlite3
+import time
+
+import busca
+import resumo_mensal
+from datas import normalizar_data
+from normalizacao import normalizar_texto
+
+MIGRACOES = []
+
+
+def migracao(fn):
+    MIGRACOES.append(fn)
+    return fn
+
+
+def _colunas(cur, tabela):
+    cur.execute(f'PRAGMA table_info("{tabela}")')
+    return [(c[1], c[2]) for c in cur.fetchall()]
+
+
+@migracao
+def m001_esquema_inicial(cur):
+    """Tabelas e triggers criados pela API antes das migrações versionadas."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS Gastos (
+        data TEXT,
+        categoria TEXT,
+        valor REAL,
+        descricao TEXT,
+        usuario TEXT
+    )
+    """)
+
+    # Impressão digital do gasto (data, valor, descrição, usuário) para barrar
+    # notificações duplicadas; linhas antigas ficam NULL e não conflitam.
+    if "impressao" not in {nome for nome, _ in _colunas(cur, "Gastos")}:
+        cur.execute("ALTER TABLE Gastos ADD COLUMN impressao TEXT")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_gastos_impressao ON Gastos(impressao)")
+
+    # Tabela de categorias com mapeamento de palavras-chave
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS Categorias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        palavra_chave TEXT UNIQUE,
+        categoria TEXT
+    )
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_categoria_delete
+        AFTER DELETE ON Categorias
+        BEGIN
+        UPDATE Gastos
+        SET categoria = 'VERIFICAR'
+        WHERE categoria = OLD.categoria;
+        END;
+        """)
+
+    # Contador de versão por tabela (mantido por triggers) para invalidar caches
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS Versoes (
+        tabela TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    cur.execute("INSERT OR IGNORE INTO Versoes (tabela, versao) VALUES ('Categorias', 0)")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_categorias_versao_{evento.lower()}
+            AFTER {evento} ON Categorias
+            BEGIN
+            UPDATE Versoes SET versao = versao + 1 WHERE tabela = 'Categorias';
+            END;
+            """)
+
+
+def _dependentes(cur, tabela):
+    """SQL dos índices da tabela e dos triggers que a usam (para recriar após rebuild)."""
+    cur.execute(
+        """
+        SELECT type, name, sql FROM sqlite_master
+         WHERE sql IS NOT NULL
+           AND ((type = 'index' AND tbl_name = ?) OR (type = 'trigger' AND (tbl_name = ? OR sql LIKE ?)))
+        """,
+        (tabela, tabela, f"%{tabela}%"),
+    )
+    return cur.fetchall()
+
+
+@migracao
+def m002_gastos_id(cur):
+    """Garante a PK `id` em Gastos (usada pela Gerência); preserva o rowid como id."""
+    colunas = _colunas(cur, "Gastos")
+    if "id" in {nome for nome, _ in colunas}:
+        return
+
+    # Triggers que citam Gastos impedem o RENAME enquanto a tabela não existe
+    dependentes = _dependentes(cur, "Gastos")
+    for tipo, nome, _ in dependentes:
+        if tipo == "trigger":
+            cur.execute(f'DROP TRIGGER IF EXISTS "{nome}"')
+
+    defs = ",\n        ".join(f'"{nome}" {tipo}'.rstrip() for nome, tipo in colunas)
+    nomes = ", ".join(f'"{nome}"' for nome, _ in colunas)
+    cur.execute(f"""
+    CREATE TABLE Gastos_nova (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        {defs}
+    )
+    """)
+    cur.execute(f"INSERT INTO Gastos_nova (id, {nomes}) SELECT rowid, {nomes} FROM Gastos ORDER BY rowid")
+    cur.execute("DROP TABLE Gastos")
+    cur.execute("ALTER TABLE Gastos_nova RENAME TO Gastos")
+    for _, _, sql in dependentes:
+        cur.execute(sql)
+
+
+@migracao
+def m003_indices_gastos(cur):
+    """Índices documentados no README + (usuario, data) para os filtros do dashboard."""
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gastos_data ON Gastos(data)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gastos_categoria ON Gastos(categoria)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gastos_usuario_data ON Gastos(usuario, data)")
+
+
+@migracao
+def m004_categorias_normalizadas(cur):
+    """Gastos passa a referenciar a categoria por id (tabela NomesCategorias).
+
+    Renomear uma categoria vira um UPDATE de uma linha em NomesCategorias e os
+    agrupamentos usam inteiros. A leitura com o nome fica na view GastosDetalhados.
+    """
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS NomesCategorias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL UNIQUE
+    )
+    """)
+    cur.execute("INSERT OR IGNORE INTO NomesCategorias (nome) VALUES ('VERIFICAR')")
+    cur.execute("""
+    INSERT OR IGNORE INTO NomesCategorias (nome)
+    SELECT categoria FROM Gastos WHERE categoria IS NOT NULL
+    UNION
+    SELECT categoria FROM Categorias WHERE categoria IS NOT NULL
+    """)
+
+    # DROP COLUMN não aceita coluna indexada ou citada em trigger
+    cur.execute("DROP TRIGGER IF EXISTS trg_categoria_delete")
+    cur.execute("DROP INDEX IF EXISTS idx_gastos_categoria")
+    cur.execute("ALTER TABLE Gastos ADD COLUMN categoria_id INTEGER REFERENCES NomesCategorias(id)")
+    cur.execute("""
+    UPDATE Gastos
+       SET categoria_id = (SELECT id FROM NomesCategorias WHERE nome = Gastos.categoria)
+     WHERE categoria IS NOT NULL
+    """)
+    cur.execute("ALTER TABLE Gastos DROP COLUMN categoria")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gastos_categoria ON Gastos(categoria_id)")
+
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_categoria_delete
+        AFTER DELETE ON Categorias
+        BEGIN
+        UPDATE Gastos
+        SET categoria_id = (SELECT id FROM NomesCategorias WHERE nome = 'VERIFICAR')
+        WHERE categoria_id = (SELECT id FROM NomesCategorias WHERE nome = OLD.categoria);
+        END;
+        """)
+
+    cur.execute("""
+    CREATE VIEW IF NOT EXISTS GastosDetalhados AS
+    SELECT g.id, g.data, n.nome AS categoria, g.valor, g.descricao, g.usuario,
+           g.categoria_id, g.impressao
+      FROM Gastos g
+      LEFT JOIN NomesCategorias n ON n.id = g.categoria_id
+    """)
+
+
+@migracao
+def m005_versao_reescritas(cur):
+    """Contador de UPDATE/DELETE em Gastos (e renomeações), para o dashboard saber
+    quando dá para só acrescentar as linhas novas (id > último lido)."""
+    cur.execute("INSERT OR IGNORE INTO Versoes (tabela, versao) VALUES ('Gastos_reescritas', 0)")
+    for tabela, evento in (("Gastos", "UPDATE"), ("Gastos", "DELETE"),
+                           ("NomesCategorias", "UPDATE"), ("NomesCategorias", "DELETE")):
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabela.lower()}_reescrita_{evento.lower()}
+            AFTER {evento} ON {tabela}
+            BEGIN
+            UPDATE Versoes SET versao = versao + 1 WHERE tabela = 'Gastos_reescritas';
+            END;
+            """)
+
+
+@migracao
+def m006_resumo_mensal(cur):
+    """Tabela ResumoMensal (soma/qtd/mín/máx por mês × usuário × categoria) e os
+    triggers que a mantêm; preenchida uma vez a partir dos gastos existentes."""
+    resumo_mensal.criar(cur)
+    resumo_mensal.reconstruir(cur)
+
+
+@migracao
+def m007_datas_normalizadas(cur):
+    """`data` no formato fixo + `data_epoch` e `mes` calculados na gravação (datas.py).
+
+    Linhas antigas são convertidas aqui; as que não têm data válida ficam como
+    estavam, com data_epoch/mes NULL.
+    """
+    nomes = {nome for nome, _ in _colunas(cur, "Gastos")}
+    if "data_epoch" not in nomes:
+        cur.execute("ALTER TABLE Gastos ADD COLUMN data_epoch INTEGER")
+    if "mes" not in nomes:
+        cur.execute("ALTER TABLE Gastos ADD COLUMN mes TEXT")
+
+    cur.execute("SELECT id, data FROM Gastos WHERE data IS NOT NULL AND data_epoch IS NULL")
+    params = []
+    for id_, data in cur.fetchall():
+        norm = normalizar_data(data)
+        if norm is not None:
+            params.append(norm + (id_,))
+    cur.executemany("UPDATE Gastos SET data = ?, data_epoch = ?, mes = ? WHERE id = ?", params)
+
+    cur.execute("DROP VIEW IF EXISTS GastosDetalhados")
+    cur.execute("""
+    CREATE VIEW GastosDetalhados AS
+    SELECT g.id, g.data, n.nome AS categoria, g.valor, g.descricao, g.usuario,
+           g.categoria_id, g.impressao, g.data_epoch, g.mes
+      FROM Gastos g
+      LEFT JOIN NomesCategorias n ON n.id = g.categoria_id
+    """)
+
+
+@migracao
+def m008_versao_nomes_categorias(cur):
+    """Contador de NomesCategorias em Versoes (versoes.py): caches que mostram o
+    nome das categorias passam a ser invalidados só quando ela muda."""
+    cur.execute("INSERT OR IGNORE INTO Versoes (tabela, versao) VALUES ('NomesCategorias', 0)")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_nomescategorias_versao_{evento.lower()}
+            AFTER {evento} ON NomesCategorias
+            BEGIN
+            UPDATE Versoes SET versao = versao + 1 WHERE tabela = 'NomesCategorias';
+            END;
+            """)
+
+
+@migracao
+def m009_busca_descricao(cur):
+    """Índice FTS5 (trigram) de Gastos.descricao, mantido por triggers (busca.py).
+    Sem FTS5/trigram no SQLite a migração passa sem criar o índice."""
+    if busca.criar(cur, coluna="descricao"):
+        busca.reconstruir(cur)
+
+
+@migracao
+def m010_textos_normalizados(cur):
+    """`Gastos.descricao_norm` e `Categorias.palavra_norm` (sem acentos, minúsculas;
+    normalizacao.py), gravadas por quem escreve e indexadas. O índice FTS da
+    busca passa a ser sobre `descricao_norm`."""
+    fts = busca.disponivel(cur.connection)
+    busca.remover(cur)  # sai antes do preenchimento (não reindexa linha a linha)
+
+    if "descricao_norm" not in {nome for nome, _ in _colunas(cur, "Gastos")}:
+        cur.execute("ALTER TABLE Gastos ADD COLUMN descricao_norm TEXT")
+    if "palavra_norm" not in {nome for nome, _ in _colunas(cur, "Categorias")}:
+        cur.execute("ALTER TABLE Categorias ADD COLUMN palavra_norm TEXT")
+
+    cur.execute("SELECT id, descricao FROM Gastos WHERE descricao_norm IS NULL")
+    memo = {}
+    params = []
+    for id_, descricao in cur.fetchall():
+        norm = memo.get(descricao)
+        if norm is None:
+            norm = memo[descricao] = normalizar_texto(descricao)
+        params.append((norm, id_))
+    cur.executemany("UPDATE Gastos SET descricao_norm = ? WHERE id = ?", params)
+    cur.execute("SELECT id, palavra_chave FROM Categorias WHERE palavra_norm IS NULL")
+    cur.executemany(
+        "UPDATE Categorias SET palavra_norm = ? WHERE id = ?",
+        [(normalizar_texto(p), id_) for id_, p in cur.fetchall()],
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gastos_descricao_norm ON Gastos(descricao_norm)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_categorias_palavra_norm ON Categorias(palavra_norm)")
+
+    if fts and busca.criar(cur):
+        busca.reconstruir(cur)
+
+
+@migracao
+def m011_tarefas(cur):
+    """Fila de tarefas longas da Gerência (tarefas.py): estado, progresso (último
+    id de Gastos já gravado, para retomar) e sinal de vida do worker."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS Tarefas (
+        id           INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo         TEXT NOT NULL,
+        parametros   TEXT NOT NULL DEFAULT '{}',
+        estado       TEXT NOT NULL DEFAULT 'pendente',
+        progresso    INTEGER NOT NULL DEFAULT 0,
+        total        INTEGER,
+        examinadas   INTEGER NOT NULL DEFAULT 0,
+        alteradas    INTEGER NOT NULL DEFAULT 0,
+        erro         TEXT,
+        dono         TEXT,
+        batida       REAL,
+        criada_em    REAL NOT NULL,
+        concluida_em REAL
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_estado ON Tarefas(estado, id)")
+
+
+@migracao
+def m012_insercao_em_lote(cur):
+    """Triggers de INSERT do resumo e da busca ficam parados durante um INSERT
+    em lote (insercao_lote.py); quem insere o lote os faz de uma vez."""
+    cur.execute("DROP TRIGGER IF EXISTS trg_resumo_insert")
+    resumo_mensal.criar(cur)
+    if busca.disponivel(cur.connection):
+        cur.execute("DROP TRIGGER IF EXISTS trg_busca_insert")
+        busca.criar(cur)
+
+
+def versao_atual(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar(conn, espera_max=60.0) -> int:
+    """Aplica as migrações pendentes e devolve a versão final do esquema."""
+    alvo = len(MIGRACOES)
+    if versao_atual(conn) >= alvo:
+        return alvo
+
+    # Só um processo migra; os outros esperam o lock e depois não têm o que fazer
+    limite = time.monotonic() + espera_max
+    while True:
+        try:
+            conn.execute("BEGIN EXCLUSIVE")
+            break
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or time.monotonic() > limite:
+                raise
+            time.sleep(0.1)
+
+    try:
+        cur = conn.cursor()
+        versao = versao_atual(conn)
+        for numero in range(versao + 1, alvo + 1):
+            MIGRACOES[numero - 1](cur)
+            print(f"Migração {numero} aplicada: {MIGRACOES[numero - 1].__name__}", flush=True)
+        if versao < alvo:
+            cur.execute(f"PRAGMA user_version = {alvo}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return alvo
+
+
+
+def migrar_se_existir(db_path) -> bool:
+    """Para o dashboard e a Gerência: aplica as migrações pendentes no banco, se
+    o arquivo já existe (quem o cria é a API). False se ainda não existe."""
+    try:
+        # mode=rw: não cria um banco vazio no lugar do que a API vai criar
+        conn = sqlite3.connect(f"file:{db_path}?mode=rw", uri=True)
+    except sqlite3.OperationalError:
+        return False
+    try:
+        conn.execute("PRAGMA busy_timeout=3000;")
+        migrar(conn)
+    finally:
+        conn.close()
+    return True
@@ -0,0 +1,37 @@
+"""Normalização de texto usada por todo casamento de palavra-chave.
+
+A descrição do gasto e a palavra-chave são comparadas já normalizadas (sem
+acentos, minúsculas, sem espaços nas pontas). A forma normalizada é gravada
+uma vez, junto com o texto (`Gastos.descricao_norm`, `Categorias.palavra_norm`),
+por quem escreve — a API e a Gerência; quem casa só compara strings prontas.
+"""
+
+import unicodedata
+
+# Regras de quais palavras-chave entram no Reprocessar/Harmonizar da Gerência
+CATEGORIAS_BLOQUEADAS = frozenset({"VERIFICAR", "Outros", "OUTROS"})
+TAMANHO_MINIMO = 4  # caracteres úteis de uma palavra-chave
+
+
+def normalizar_texto(txt: str) -> str:
+    """Remove acentos e coloca em minúsculo para comparação."""
+    if not txt:
+        return ""
+    txt = "".join(
+        c
+        for c in unicodedata.normalize("NFKD", txt)
+        if not unicodedata.combining(c)
+    )
+    return txt.lower().strip()
+
+
+def tamanho_util(txt: str) -> int:
+    if not txt:
+        return 0
+    return sum(ch.isalnum() for ch in txt)
+
+
+def palavra_valida(palavra, categoria, bloqueadas=CATEGORIAS_BLOQUEADAS, tamanho_minimo=TAMANHO_MINIMO) -> bool:
+    """Se a palavra-chave participa do casamento: categoria não bloqueada e
+    palavra com pelo menos `tamanho_minimo` caracteres úteis."""
+    return bool(categoria) and categoria not in bloqueadas and tamanho_util(palavra) >= tamanho_minimo
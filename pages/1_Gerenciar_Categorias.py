@@ -1,21 +1,26 @@
 import sqlite3
 import pandas as pd
 import streamlit as st
-import unicodedata
-import time
 from contextlib import closing
 import os, hmac, hashlib
 
+import busca
+import migracoes
+import tarefas
+import versoes
+from normalizacao import CATEGORIAS_BLOQUEADAS, TAMANHO_MINIMO, normalizar_texto, tamanho_util
+
 
 # CONFIG / CONSTANTES
 
-DB_PATH = "/data/Gasto.db"  # ajuste para seu ambiente local se precisar
+DB_PATH = os.environ.get("DB_PATH", "/data/Gasto.db")  # ajuste para seu ambiente local se precisar
 TABLE_GASTOS = "Gastos"  # nome da tabela de gastos
+VIEW_GASTOS = "GastosDetalhados"  # Gastos com o nome da categoria (categoria_id -> NomesCategorias)
 
 st.set_page_config(page_title="Gerência", page_icon="🛠️", layout="wide")
 
 # LISTAS DE AJUDA
-BLOCKED_CATS = {"VERIFICAR", "Outros", "OUTROS"}
+BLOCKED_CATS = CATEGORIAS_BLOQUEADAS  # mesma regra da API (normalizacao.py)
 EDITABLE_FIELDS = {"descricao", "categoria"}
 
 
@@ -67,35 +72,44 @@ def logout_button():
             st.experimental_rerun()
 
 
+# Banco antigo (ainda sem Tarefas etc.) é migrado aqui mesmo, como no Dashboard
+try:
+    _banco_pronto, _erro_banco = migracoes.migrar_se_existir(DB_PATH), None
+except sqlite3.Error as e:
+    _banco_pronto, _erro_banco = False, e
+tarefas.iniciar(DB_PATH)  # retoma tarefas interrompidas mesmo sem ninguém logado
 require_login()
 logout_button()
+if _erro_banco is not None:
+    st.error(f"Não foi possível atualizar o esquema do banco: {_erro_banco}")
+    st.stop()
+if not _banco_pronto:
+    st.info("Banco de dados ainda não criado: ele aparece quando a API subir pela primeira vez.")
+    st.stop()
 
-# HELPERS
+# OPERACOES DE BANCO (COMUNS)
 
 
-def _tamanho_util(txt: str) -> int:
-    if not txt:
-        return 0
-    return sum(ch.isalnum() for ch in txt)
+def conectar():
+    return sqlite3.connect(DB_PATH)
 
 
-def normalizar_texto(txt: str) -> str:
-    """Remove acentos e coloca em minúsculo para comparação."""
-    if not txt:
-        return ""
-    txt = "".join(
-        c
-        for c in unicodedata.normalize("NFKD", txt)
-        if not unicodedata.combining(c)
-    )
-    return txt.lower().strip()
+def versao(*tabelas):
+    """Versão atual das tabelas (versoes.py), para a chave dos caches desta página."""
+    with closing(conectar()) as conn:
+        return versoes.versao(conn, *tabelas)
 
 
-# OPERACOES DE BANCO (COMUNS)
+def avisar(msg: str, icone: str = "✅"):
+    """Aviso mostrado (toast) na próxima execução, depois do st.rerun() da ação."""
+    st.session_state.setdefault("avisos", []).append((msg, icone))
 
 
-def conectar():
-    return sqlite3.connect(DB_PATH)
+def id_categoria(cur, nome: str) -> int:
+    """Id do nome da categoria em NomesCategorias (cria se não existir)."""
+    cur.execute("INSERT OR IGNORE INTO NomesCategorias (nome) VALUES (?)", (nome,))
+    cur.execute("SELECT id FROM NomesCategorias WHERE nome = ?", (nome,))
+    return cur.fetchone()[0]
 
 
 def gastos_table_columns(conn, table):
@@ -135,9 +149,16 @@ def gastos_fetch_by_id_range(
 
 
 def gastos_update_row(conn, table, row_id, changes: dict):
-    """Atualiza campos do registro pelo ID."""
+    """Atualiza campos do registro pelo ID (categoria é gravada como categoria_id)."""
     if not changes:
         return 0
+    changes = dict(changes)
+    if "categoria" in changes:
+        nome = changes.pop("categoria")
+        with closing(conn.cursor()) as cur:
+            changes["categoria_id"] = id_categoria(cur, nome) if nome else None
+    if "descricao" in changes:
+        changes["descricao_norm"] = normalizar_texto(changes["descricao"])
     fields = ", ".join([f'"{k}" = ?' for k in changes.keys()])
     params = list(changes.values()) + [int(row_id)]
     with closing(conn.cursor()) as cur:
@@ -156,6 +177,9 @@ def gastos_coerce_type(orig_val, new_val_str):
 # ===== UI: EDITAR GASTOS =====
 st.title("🛠️ Gerência")
 
+for _msg, _icone in st.session_state.pop("avisos", []):
+    st.toast(_msg, icon=_icone)
+
 st.header("Editar Gastos")
 
 conn_g = conectar()
@@ -175,11 +199,13 @@ with closing(conn_g.cursor()) as cur:
 if not ok:
     st.error(f'A tabela "{TABLE_GASTOS}" não foi encontrada no banco.')
 else:
-    cols_info = gastos_table_columns(conn_g, TABLE_GASTOS)
+    cols_info = gastos_table_columns(conn_g, VIEW_GASTOS)
     pk_name = "id"
     st.caption(f"Chave usada para edição: **{pk_name}**")
 
-    tab_id, tab_range = st.tabs(["Editar por ID", "Pesquisar por Faixa de ID"])
+    tab_id, tab_range, tab_busca = st.tabs(
+        ["Editar por ID", "Pesquisar por Faixa de ID", "Pesquisar por descrição"]
+    )
 
     # -------- TAB: EDITAR POR ID --------
     with tab_id:
@@ -187,7 +213,7 @@ else:
         target_id = st.number_input("ID", min_value=1, step=1, value=1)
         if st.button("Carregar registro", type="primary"):
             st.session_state["_gasto_edit"] = gastos_fetch_by_id(
-                conn_g, TABLE_GASTOS, int(target_id)
+                conn_g, VIEW_GASTOS, int(target_id)
             )
 
         registro = st.session_state.get("_gasto_edit")
@@ -252,7 +278,7 @@ else:
                                 if rows == 1:
                                     st.success("Atualizado com sucesso.")
                                     st.session_state["_gasto_edit"] = gastos_fetch_by_id(
-                                        conn_g, TABLE_GASTOS, registro["id"]
+                                        conn_g, VIEW_GASTOS, registro["id"]
                                     )
                                 else:
                                     st.warning("Nada foi alterado.")
@@ -292,7 +318,7 @@ else:
         if st.button("Pesquisar", type="primary", key="btn_search_r"):
             st.session_state["_range_rows"] = gastos_fetch_by_id_range(
                 conn_g,
-                TABLE_GASTOS,
+                VIEW_GASTOS,
                 start_id,
                 end_id,
                 limit=page_size,
@@ -309,7 +335,7 @@ else:
             sel_id = st.selectbox("Escolha um ID para editar", id_opcoes)
             if st.button("Carregar seleção", key="load_sel_r"):
                 st.session_state["_gasto_edit"] = gastos_fetch_by_id(
-                    conn_g, TABLE_GASTOS, int(sel_id)
+                    conn_g, VIEW_GASTOS, int(sel_id)
                 )
 
             registro = st.session_state.get("_gasto_edit")
@@ -369,13 +395,13 @@ else:
                                 if rows == 1:
                                     st.success("Atualizado com sucesso.")
                                     st.session_state["_gasto_edit"] = gastos_fetch_by_id(
-                                        conn_g, TABLE_GASTOS, registro["id"]
+                                        conn_g, VIEW_GASTOS, registro["id"]
                                     )
                                     st.session_state[
                                         "_range_rows"
                                     ] = gastos_fetch_by_id_range(
                                         conn_g,
-                                        TABLE_GASTOS,
+                                        VIEW_GASTOS,
                                         start_id,
                                         end_id,
                                         limit=page_size,
@@ -387,6 +413,30 @@ else:
                             except Exception as e:
                                 st.error(f"Erro ao atualizar: {e}")
 
+    # -------- TAB: PESQUISAR POR DESCRIÇÃO --------
+    with tab_busca:
+        st.subheader("Trecho da descrição (índice FTS, por relevância)")
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            termo = st.text_input("Buscar", key="termo_b", placeholder="ex: ifood, giassi, posto")
+        with col2:
+            page_size_b = st.selectbox("Itens por página", [10, 25, 50], index=1, key="ps_b")
+        with col3:
+            page_b = st.number_input("Página", min_value=1, value=1, step=1, key="pg_b")
+
+        if termo.strip():
+            res, total = busca.pesquisar(
+                conn_g, termo, limite=page_size_b, deslocamento=(page_b - 1) * page_size_b
+            )
+            paginas = max(1, -(-total // page_size_b))
+            st.caption(f"{total} gasto(s) · página {page_b} de {paginas}")
+            if res.empty:
+                st.info("Nenhum resultado nesta página.")
+            else:
+                st.dataframe(res, hide_index=True)
+            if len(termo.strip()) < busca.TAMANHO_MINIMO or not busca.disponivel(conn_g):
+                st.caption("Busca sem índice (termo com menos de 3 caracteres ou SQLite sem FTS5).")
+
 # fecha conexão local usada nessa seção
 try:
     conn_g.close()
@@ -399,143 +449,78 @@ except Exception:
 st.divider()
 st.header("Editar Categorias")
 
-# Atalho para recarregar dashboard
-if st.sidebar.button("Atualizar agora"):
-    st.cache_data.clear()
-    st.rerun()
-
 
 # --------- Tabela principal (CRUD) ---------
+# Leituras em cache com a versão das tabelas lidas na chave: uma ação que muda
+# só Categorias não invalida a lista de 'VERIFICAR' (e vice-versa).
+@st.cache_data(max_entries=4, show_spinner=False)
+def _categorias(db_path, versao_categorias) -> pd.DataFrame:
+    with closing(sqlite3.connect(db_path)) as conn:
+        return pd.read_sql_query("SELECT id, palavra_chave, categoria FROM Categorias", conn)
+
+
 def carregar_categorias() -> pd.DataFrame:
-    conn = conectar()
-    df = pd.read_sql_query("SELECT * FROM Categorias", conn)
-    conn.close()
-    return df
+    return _categorias(DB_PATH, versao("Categorias"))
 
 
-def atualizar_categorias(df_editado: pd.DataFrame):
-    conn = conectar()
-    cur = conn.cursor()
-    for _, row in df_editado.iterrows():
-        cur.execute(
-            """
-            UPDATE Categorias
-               SET palavra_chave = ?, categoria = ?
-             WHERE id = ?
-        """,
-            (row["palavra_chave"], row["categoria"], row["id"]),
-        )
-    conn.commit()
-    conn.close()
+def linhas_alteradas(df_original: pd.DataFrame, df_editado: pd.DataFrame) -> pd.DataFrame:
+    """Linhas do editor que mudaram: id, palavra/categoria antes (_antes) e depois."""
+    campos = ["palavra_chave", "categoria"]
+    antes = df_original.set_index("id")[campos]
+    depois = df_editado.set_index("id")[campos].reindex(antes.index)
+    mudou = (antes.fillna("") != depois.fillna("")).any(axis=1)
+    return depois[mudou].join(antes[mudou], rsuffix="_antes").reset_index()
 
 
-def sincronizar_gastos() -> int:
-    """Atualiza Gastos.categoria via LIKE em descricao, ignorando bloqueadas e chaves curtas."""
-    conn = conectar()
-    cur = conn.cursor()
+def atualizar_categorias(df_original: pd.DataFrame, df_editado: pd.DataFrame):
+    """Grava só as palavras-chave alteradas e enfileira a reavaliação dos gastos que elas alcançam.
 
-    cur.execute("SELECT palavra_chave, categoria FROM Categorias")
-    categorias = [
-        (pk, cat)
-        for pk, cat in cur.fetchall()
-        if (cat not in BLOCKED_CATS) and _tamanho_util(pk) >= 4
-    ]
+    As palavras e a tarefa 'sincronizar' (tarefas.py) vão na mesma transação.
+    Palavras sem mudança não custam nada: os gastos reavaliados são os que
+    contêm a palavra antiga ou a nova de alguma linha alterada.
+    Retorna (palavras alteradas, id da tarefa).
+    """
+    alteradas = linhas_alteradas(df_original, df_editado)
+    if alteradas.empty:
+        return 0, None
 
-    atualizados = 0
-    for palavra, cat in categorias:
-        cur.execute(
-            f"""
-            UPDATE {TABLE_GASTOS}
-               SET categoria = ?
-             WHERE LOWER(descricao) LIKE LOWER(?)
+    with closing(conectar()) as conn:
+        conn.executemany(
+            """
+            UPDATE Categorias
+               SET palavra_chave = ?, palavra_norm = ?, categoria = ?
+             WHERE id = ?
         """,
-            (cat, f"%{palavra}%"),
+            (
+                (pk, normalizar_texto(pk), cat, id_)
+                for id_, pk, cat in alteradas[["id", "palavra_chave", "categoria"]].itertuples(index=False, name=None)
+            ),
         )
-        atualizados += cur.rowcount
-
-    conn.commit()
-    conn.close()
-    return atualizados
-
-
-def recategorizar_todos() -> int:
-    """Reatribui 'categoria' em Gastos com base em Categorias (ignorando bloqueadas), só se mudar."""
-    conn = conectar()
-    cur = conn.cursor()
-
-    cur.execute("SELECT palavra_chave, categoria FROM Categorias")
-    categorias = [
-        (pk, cat)
-        for pk, cat in cur.fetchall()
-        if (cat not in BLOCKED_CATS) and _tamanho_util(pk) >= 4
-    ]
-
-    cur.execute(f"SELECT id, descricao, categoria FROM {TABLE_GASTOS}")
-    gastos = cur.fetchall()
-
-    atualizados = 0
-    for gid, desc, cat_atual in gastos:
-        desc_norm = normalizar_texto(desc)
-        nova_cat = None
-        for palavra, cat in categorias:
-            if normalizar_texto(palavra) in desc_norm:
-                nova_cat = cat
-                break
-        if nova_cat and nova_cat != cat_atual:
-            cur.execute(
-                f"UPDATE {TABLE_GASTOS} SET categoria = ? WHERE id = ?",
-                (nova_cat, gid),
-            )
-            atualizados += 1
+        palavras = set(alteradas["palavra_chave"].dropna()) | set(alteradas["palavra_chave_antes"].dropna())
+        tarefa = tarefas.enfileirar(
+            conn, "sincronizar", palavras=sorted(palavras), bloqueadas=sorted(BLOCKED_CATS)
+        )
+        conn.commit()
+    return len(alteradas), tarefa
 
-    conn.commit()
-    conn.close()
-    return atualizados
 
+def reprocessar_categorias():
+    """Enfileira a recategorização de todos os gastos e, depois dela, a harmonização.
 
-def harmonizar_categorias():
-    """
-    Garante que toda categoria presente em Gastos exista em Categorias.
-    - Não cria se for bloqueada (VERIFICAR/Outros) ou < 4 caracteres úteis.
-    - Usa a própria categoria como palavra_chave (lower) e categoria (Title).
-    Retorna (adicionadas, ignoradas).
+    As duas rodam no worker (tarefas.py), em blocos com commit; retorna os ids.
     """
-    conn = conectar()
-    cur = conn.cursor()
+    with closing(conectar()) as conn:
+        ids = [
+            tarefas.enfileirar(conn, tipo, bloqueadas=sorted(BLOCKED_CATS))
+            for tipo in ("recategorizar", "harmonizar")
+        ]
+        conn.commit()
+    return ids
 
-    cur.execute(
-        f"""
-        SELECT DISTINCT g.categoria
-          FROM {TABLE_GASTOS} g
-          LEFT JOIN Categorias c ON c.categoria = g.categoria
-         WHERE c.categoria IS NULL
-           AND g.categoria IS NOT NULL
-    """
-    )
-    faltantes = [r[0] for r in cur.fetchall()]
-
-    adicionadas = 0
-    ignoradas = 0
-
-    for cat in faltantes:
-        cat_str = (cat or "").strip()
-        if (cat_str in BLOCKED_CATS) or (_tamanho_util(cat_str) < 4):
-            ignoradas += 1
-            continue
-
-        cur.execute(
-            """
-            INSERT OR IGNORE INTO Categorias (palavra_chave, categoria)
-            VALUES (?, ?)
-        """,
-            (cat_str.lower(), cat_str.title()),
-        )
-        if cur.rowcount > 0:
-            adicionadas += 1
 
-    conn.commit()
-    conn.close()
-    return adicionadas, ignoradas
+def acompanhar(*ids):
+    """Tarefas desta sessão: o painel avisa quando terminarem."""
+    st.session_state.setdefault("tarefas", set()).update(i for i in ids if i is not None)
 
 
 def adicionar_categoria(palavra: str, categoria: str):
@@ -543,17 +528,17 @@ def adicionar_categoria(palavra: str, categoria: str):
     pk = (palavra or "").strip()
     cat = (categoria or "").strip()
 
-    if (cat in BLOCKED_CATS) or (_tamanho_util(pk) < 4) or (_tamanho_util(cat) < 4):
+    if (cat in BLOCKED_CATS) or (tamanho_util(pk) < TAMANHO_MINIMO) or (tamanho_util(cat) < TAMANHO_MINIMO):
         return
 
     conn = conectar()
     cur = conn.cursor()
     cur.execute(
         """
-        INSERT OR IGNORE INTO Categorias (palavra_chave, categoria)
-        VALUES (?, ?)
+        INSERT OR IGNORE INTO Categorias (palavra_chave, palavra_norm, categoria)
+        VALUES (?, ?, ?)
     """,
-        (pk.lower(), cat.title()),
+        (pk.lower(), normalizar_texto(pk), cat.title()),
     )
     conn.commit()
     conn.close()
@@ -575,14 +560,57 @@ def excluir_categoria(nome_cat: str, reclassificar: bool = False) -> int:
     afetados = cur.rowcount
     if reclassificar:
         cur.execute(
-            f"UPDATE {TABLE_GASTOS} SET categoria = 'VERIFICAR' WHERE categoria = ?",
-            (nome_cat,),
+            f"""
+            UPDATE {TABLE_GASTOS}
+               SET categoria_id = ?
+             WHERE categoria_id = (SELECT id FROM NomesCategorias WHERE nome = ?)
+        """,
+            (id_categoria(cur, "VERIFICAR"), nome_cat),
         )
     conn.commit()
     conn.close()
     return afetados
 
 
+def renomear_categoria(nome_atual: str, novo_nome: str) -> int:
+    """Renomeia a categoria: uma linha em NomesCategorias + as palavras-chave dela.
+
+    O novo nome é normalizado como na inclusão (`.title()`). Se ele já existir,
+    as duas categorias são fundidas: os gastos da antiga são repontados e a
+    linha dela sai de NomesCategorias, na mesma transação. Retorna quantas
+    palavras-chave foram atualizadas.
+    """
+    cru = (novo_nome or "").strip()
+    novo = cru.title()
+    if (cru in BLOCKED_CATS) or (novo in BLOCKED_CATS) or (tamanho_util(novo) < TAMANHO_MINIMO) or novo == nome_atual:
+        return 0
+
+    conn = conectar()
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM NomesCategorias WHERE nome = ?", (novo,))
+    existente = cur.fetchone()
+    if existente is None:
+        cur.execute("UPDATE NomesCategorias SET nome = ? WHERE nome = ?", (novo, nome_atual))
+    else:
+        cur.execute(
+            f"""
+            UPDATE {TABLE_GASTOS}
+               SET categoria_id = ?
+             WHERE categoria_id = (SELECT id FROM NomesCategorias WHERE nome = ?)
+        """,
+            (existente[0], nome_atual),
+        )
+        cur.execute("DELETE FROM NomesCategorias WHERE nome = ?", (nome_atual,))
+    cur.execute(
+        "UPDATE Categorias SET categoria = ? WHERE categoria = ?",
+        (novo, nome_atual),
+    )
+    afetados = cur.rowcount
+    conn.commit()
+    conn.close()
+    return afetados
+
+
 # --------- Tabela principal (CRUD) ---------
 st.subheader("📋 Categorias Cadastradas")
 df_cat = carregar_categorias()
@@ -602,13 +630,15 @@ else:
     )
 
     if st.button("💾 Salvar alterações"):
-        atualizar_categorias(editadas)
-        atualizados = sincronizar_gastos()
-        st.cache_data.clear()
-        st.success(
-            f"Categorias atualizadas com sucesso! ({atualizados} registros sincronizados em Gastos)"
-        )
-        time.sleep(2.5)
+        n_palavras, tarefa = atualizar_categorias(df_cat, editadas)
+        if not n_palavras:
+            avisar("Nada a salvar.", "ℹ️")
+        else:
+            acompanhar(tarefa)
+            avisar(
+                f"{n_palavras} palavra(s)-chave atualizada(s); os gastos afetados estão sendo "
+                f"reavaliados em segundo plano (tarefa #{tarefa})."
+            )
         st.rerun()
 
 # --------- Adicionar nova categoria ---------
@@ -623,8 +653,8 @@ with col2:
         "Nome da categoria (ex: Mercado, Jogos, Alimentação)"
     )
 
-valida_palavra = _tamanho_util(nova_palavra) >= 4
-valida_categoria = _tamanho_util(nova_categoria) >= 4
+valida_palavra = tamanho_util(nova_palavra) >= TAMANHO_MINIMO
+valida_categoria = tamanho_util(nova_categoria) >= TAMANHO_MINIMO
 
 if nova_palavra and not valida_palavra:
     st.caption(
@@ -640,9 +670,7 @@ with col3:
     add_disabled = not (valida_palavra and valida_categoria)
     if st.button("Adicionar", type="primary", disabled=add_disabled):
         adicionar_categoria(nova_palavra, nova_categoria)
-        st.cache_data.clear()
-        st.success(f"Categoria '{nova_categoria}' adicionada!")
-        time.sleep(2.5)
+        avisar(f"Categoria '{nova_categoria}' adicionada!")
         st.rerun()
 
 # --------- Excluir palavra-chave (linha única) ---------
@@ -657,9 +685,7 @@ if not df_cat.empty:
     if st.button("Excluir"):
         id_cat = id_para_excluir.split(" - ")[0]
         excluir_palavra_chave(id_cat)
-        st.cache_data.clear()
-        st.warning("Palavra chave removida com sucesso!")
-        time.sleep(2.5)
+        avisar("Palavra chave removida com sucesso!", "🗑️")
         st.rerun()
 
 # --------- Excluir categoria inteira ---------
@@ -674,11 +700,28 @@ if not df_cat.empty:
     )
     if st.button("Excluir categoria inteira"):
         qtd = excluir_categoria(cat_bulk, reclassificar=reclass)
-        st.cache_data.clear()
-        st.warning(f"Removidas {qtd} palavras-chave da categoria '{cat_bulk}'.")
+        avisar(f"Removidas {qtd} palavras-chave da categoria '{cat_bulk}'.", "🗑️")
         if reclass:
-            st.info("Todos os gastos dessa categoria foram marcados como 'VERIFICAR'.")
-        time.sleep(2.5)
+            avisar("Todos os gastos dessa categoria foram marcados como 'VERIFICAR'.", "ℹ️")
+        st.rerun()
+
+# --------- Renomear categoria ---------
+st.divider()
+st.subheader("✏️ Renomear categoria")
+
+if not df_cat.empty:
+    categorias_unicas = sorted(df_cat["categoria"].dropna().unique().tolist())
+    cat_ren = st.selectbox("Categoria atual:", categorias_unicas, key="ren_cat")
+    novo_nome = st.text_input("Novo nome", key="ren_novo")
+    if novo_nome and (tamanho_util(novo_nome) < TAMANHO_MINIMO or novo_nome.strip().title() in BLOCKED_CATS):
+        st.caption(
+            "⚠️ O novo nome deve ter pelo menos 4 caracteres úteis e não pode ser reservado."
+        )
+    if st.button("Renomear", disabled=not novo_nome):
+        qtd = renomear_categoria(cat_ren, novo_nome)
+        avisar(
+            f"Categoria '{cat_ren}' renomeada para '{novo_nome.strip().title()}' ({qtd} palavra(s)-chave)."
+        )
         st.rerun()
 
 # --------- Reprocessar + Harmonizar ---------
@@ -691,39 +734,78 @@ st.write(
 )
 
 if st.button("⚙️ Reprocessar todas as categorias"):
-    with st.spinner("Reprocessando..."):
-        total = recategorizar_todos()
-        add, skip = harmonizar_categorias()
-
-    st.cache_data.clear()
-    st.success(f"✅ {total} registros recategorizados.")
-    if add:
-        st.info(
-            f"➕ {add} categoria(s) criada(s) em 'Categorias' para alinhar com 'Gastos'."
-        )
-    if skip:
-        st.warning(
-            f"⚠️ {skip} categoria(s) ignoradas por serem bloqueadas ou < 4 caracteres."
-        )
-    time.sleep(2.5)
+    ids = reprocessar_categorias()
+    acompanhar(*ids)
+    avisar(f"Reprocessamento enfileirado (tarefas #{ids[0]} e #{ids[1]}).", "⏳")
     st.rerun()
 
+
+ROTULOS_TAREFAS = {
+    "recategorizar": "Recategorizar todos os gastos",
+    "sincronizar": "Reavaliar gastos das palavras alteradas",
+    "harmonizar": "Harmonizar Categorias com Gastos",
+}
+
+
+def resumo_tarefa(t) -> str:
+    if t["estado"] == "erro":
+        return f"falhou: {t['erro']}"
+    if t["tipo"] == "harmonizar":
+        criadas = t["alteradas"]
+        return f"{criadas} categoria(s) criada(s), {t['examinadas'] - criadas} ignorada(s) (bloqueadas ou < 4 caracteres)"
+    return f"{t['examinadas']} gasto(s) examinado(s), {t['alteradas']} recategorizado(s)"
+
+
+def _painel_tarefas():
+    """Estado das últimas tarefas. Enquanto houver tarefa ativa, o fragmento se
+    reexecuta sozinho; quando uma tarefa desta sessão termina, avisa e recarrega
+    a página (as listas em cache se renovam pela versão das tabelas)."""
+    with closing(conectar()) as conn:
+        lista = tarefas.listar(conn, limite=5)
+        ativas = tarefas.ativas(conn)
+    if not lista:
+        st.caption("Nenhuma tarefa executada ainda.")
+        return
+    for t in lista:
+        rotulo = f"#{t['id']} · {ROTULOS_TAREFAS.get(t['tipo'], t['tipo'])}"
+        if t["estado"] in tarefas.ATIVAS:
+            st.progress(tarefas.fracao(t), text=f"{rotulo} — {t['estado']}")
+        else:
+            st.caption(f"{'✅' if t['estado'] == 'concluida' else '❌'} {rotulo} — {resumo_tarefa(t)}")
+
+    acompanhadas = st.session_state.get("tarefas", set())
+    terminadas = [t for t in lista if t["id"] in acompanhadas and t["estado"] not in tarefas.ATIVAS]
+    for t in sorted(terminadas, key=lambda t: t["id"]):
+        acompanhadas.discard(t["id"])
+        avisar(f"Tarefa #{t['id']}: {resumo_tarefa(t)}.", "✅" if t["estado"] == "concluida" else "❌")
+    if terminadas or (_ativas and not ativas):
+        st.rerun()  # a página toda: para o polling e mostra os dados novos
+
+
+with closing(conectar()) as _conn:
+    _ativas = tarefas.ativas(_conn)
+st.fragment(run_every=2 if _ativas else None)(_painel_tarefas)()
+
 # --------- Corrigir 'VERIFICAR' ---------
 st.divider()
 st.subheader("🛠️ Corrigir gastos em 'VERIFICAR'")
 
-conn = conectar()
-df_ver = pd.read_sql_query(
-    f"""
+@st.cache_data(max_entries=4, show_spinner=False)
+def _pendentes_verificar(db_path, versao_gastos) -> pd.DataFrame:
+    with closing(sqlite3.connect(db_path)) as conn:
+        return pd.read_sql_query(
+            f"""
   SELECT id, data, descricao, valor, usuario, categoria
-    FROM {TABLE_GASTOS}
-   WHERE categoria = 'VERIFICAR'
+    FROM {VIEW_GASTOS}
+   WHERE categoria_id = (SELECT id FROM NomesCategorias WHERE nome = 'VERIFICAR')
 ORDER BY data DESC
    LIMIT 500
 """,
-    conn,
-)
-conn.close()
+            conn,
+        )
+
+
+df_ver = _pendentes_verificar(DB_PATH, versao("Gastos", "NomesCategorias"))
 
 if df_ver.empty:
     st.success("Sem pendências em 'VERIFICAR'.")
@@ -773,14 +855,12 @@ else:
                 if not new_cat or new_cat in BLOCKED_CATS:
                     continue
                 cur.execute(
-                    f"UPDATE {TABLE_GASTOS} SET categoria = ? WHERE id = ?",
-                    (new_cat, int(gid)),
+                    f"UPDATE {TABLE_GASTOS} SET categoria_id = ? WHERE id = ?",
+                    (id_categoria(cur, new_cat), int(gid)),
                 )
                 atualizados += 1
             conn.commit()
             conn.close()
 
-            st.cache_data.clear()
-            st.success(f"{atualizados} registro(s) recategorizado(s).")
-            time.sleep(2.5)
+            avisar(f"{atualizados} registro(s) recategorizado(s).")
             st.rerun()
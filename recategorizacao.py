@@ -0,0 +1,115 @@
+"""Recategorização de Gastos em uma passada (usada pela Gerência).
+
+Palavras-chave e descrições chegam já normalizadas do banco
+(`palavra_norm`, `descricao_norm`, gravadas por quem escreve; ver
+normalizacao.py): as palavras válidas entram num automato
+(categorizador.montar_automato, o mesmo da API)
+e cada descrição distinta passa uma vez por ele, com memo (as lojas se
+repetem muito); linha sem a forma normalizada é normalizada na hora. Gastos
+é lido em blocos por id (keyset) e as mudanças vão por executemany, só para
+as linhas cuja categoria muda de fato.
+
+Com `palavras`, só as linhas cuja descrição contém alguma dessas palavras
+(as que mudaram no editor) são reavaliadas: as demais não podem ter mudado
+de categoria. As candidatas vêm do índice FTS de `descricao_norm`
+(busca.py), sem varrer Gastos; sem o índice, a varredura filtra por um automato.
+
+Para rodar em blocos com commit (tarefas.py), `ao_concluir_bloco` é chamada
+depois das mudanças de cada bloco e `inicio` retoma depois do último id já
+processado.
+
+Mesmo resultado do loop antigo: vence a primeira palavra-chave (menor id)
+contida na descrição, sem diferenciar acentos nem maiúsculas; categorias
+bloqueadas e palavras com menos de 4 caracteres úteis ficam de fora.
+"""
+
+import busca
+from categorizador import Automato, montar_automato
+from normalizacao import normalizar_texto
+
+LINHAS_POR_BLOCO = 5_000
+
+
+class _IdsCategorias:
+    """nome -> id de NomesCategorias; cria o nome só quando uma linha vai usá-lo."""
+
+    def __init__(self, cur):
+        self._cur = cur
+        cur.execute("SELECT nome, id FROM NomesCategorias")
+        self._ids = dict(cur.fetchall())
+
+    def __call__(self, nome):
+        id_ = self._ids.get(nome)
+        if id_ is None:
+            self._cur.execute("INSERT OR IGNORE INTO NomesCategorias (nome) VALUES (?)", (nome,))
+            self._cur.execute("SELECT id FROM NomesCategorias WHERE nome = ?", (nome,))
+            id_ = self._ids[nome] = self._cur.fetchone()[0]
+        return id_
+
+
+def recategorizar(conn, bloqueadas, palavras=None, linhas_por_bloco=LINHAS_POR_BLOCO,
+                  inicio=0, ao_concluir_bloco=None):
+    """Reatribui categoria_id em Gastos onde alguma palavra-chave casa e a categoria muda.
+
+    `palavras`: se dado, reavalia só as linhas que contêm alguma delas.
+    `inicio`: só linhas com id maior. `ao_concluir_bloco(ultimo_id, examinadas,
+    alteradas)`: chamada a cada bloco, com os números do bloco (pode fazer commit).
+    Não faz commit; devolve (linhas examinadas, linhas alteradas).
+    """
+    cur = conn.cursor()
+    automato = montar_automato(cur, bloqueadas)
+    filtro = None
+    sql = "SELECT id, descricao_norm, descricao, categoria_id FROM Gastos WHERE id > ? ORDER BY id LIMIT ?"
+    if palavras is not None:
+        normalizadas = {normalizar_texto(p) for p in palavras} - {""}
+        if not normalizadas:
+            return 0, 0
+        # o índice (trigram, sem diferenciar maiúsculas) devolve um superconjunto
+        filtro = Automato((p, True) for p in normalizadas)
+        if busca.candidatos(conn, normalizadas):
+            sql = (
+                "SELECT g.id, g.descricao_norm, g.descricao, g.categoria_id FROM temp.candidatos c"
+                " JOIN Gastos g ON g.id = c.id WHERE c.id > ? ORDER BY c.id LIMIT ?"
+            )
+    if not len(automato):
+        return 0, 0
+    id_categoria = _IdsCategorias(cur)
+    memo = {}  # descrição normalizada -> nome da categoria (None: nenhuma casa; False: fora do filtro)
+
+    examinadas = alteradas = 0
+    ultimo = inicio
+    while True:
+        cur.execute(sql, (ultimo, linhas_por_bloco))
+        bloco = cur.fetchall()
+        if not bloco:
+            break
+        ultimo = bloco[-1][0]
+
+        mudancas = []
+        examinadas_bloco = 0
+        for gid, norm, desc, cat_id in bloco:
+            if norm is None:
+                norm = normalizar_texto(desc)
+            try:
+                nova = memo[norm]
+            except KeyError:
+                if filtro is not None and filtro.primeiro(norm) is None:
+                    nova = False  # não contém palavra alterada: fica como está
+                else:
+                    nova = automato.primeiro(norm)
+                memo[norm] = nova
+            if nova is False:
+                continue
+            examinadas_bloco += 1
+            if nova is not None:
+                nova_id = id_categoria(nova)
+                if nova_id != cat_id:
+                    mudancas.append((nova_id, gid))
+        if mudancas:
+            cur.executemany("UPDATE Gastos SET categoria_id = ? WHERE id = ?", mudancas)
+        examinadas += examinadas_bloco
+        alteradas += len(mudancas)
+        if ao_concluir_bloco is not None:
+            ao_concluir_bloco(ultimo, examinadas_bloco, len(mudancas))
+    cur.execute("DROP TABLE IF EXISTS temp.candidatos")
+    return examinadas, alteradas
@@ -0,0 +1,205 @@
+"""Resumo mensal de Gastos por (usuario, categoria_id, mes), mantido por triggers.
+
+O dashboard lê métricas e gráficos daqui em vez de varrer Gastos. A soma é
+guardada em centavos (inteiro) para continuar exata depois de muitos
+INSERT/UPDATE/DELETE; mínimo e máximo são recalculados pelo índice
+idx_gastos_grupo só quando a linha removida era o mínimo ou o máximo.
+
+Chaves nulas viram '' (usuario, mes) e 0 (categoria_id), pois fazem parte da PK.
+
+INSERT em lote (insercao_lote.py) não passa pelo trigger de INSERT: quem
+insere soma as linhas novas de uma vez com `somar_desde`.
+
+Uso (reconstrução manual, ex.: depois de importar um banco por fora):
+    python resumo_mensal.py --reconstruir [--db /data/Gasto.db]
+    python resumo_mensal.py --conferir
+"""
+
+import argparse
+import os
+import sqlite3
+
+import insercao_lote
+
+TABELA = "ResumoMensal"
+
+
+def _chave(r):
+    return (
+        f"IFNULL({r}usuario, '')",
+        f"IFNULL({r}categoria_id, 0)",
+        f"IFNULL(substr({r}data, 1, 7), '')",
+    )
+
+
+def _centavos(r):
+    return f"CAST(ROUND({r}valor * 100) AS INTEGER)"
+
+
+def _onde(r):
+    u, c, m = _chave(r)
+    return f"usuario = {u} AND categoria_id = {c} AND mes = {m}"
+
+
+def _somar(r):
+    u, c, m = _chave(r)
+    return f"""
+            INSERT OR IGNORE INTO {TABELA} (usuario, categoria_id, mes) VALUES ({u}, {c}, {m});
+            UPDATE {TABELA}
+               SET soma_centavos = soma_centavos + IFNULL({_centavos(r)}, 0),
+                   qtd = qtd + 1,
+                   qtd_valor = qtd_valor + ({r}valor IS NOT NULL),
+                   minimo = CASE WHEN {r}valor IS NOT NULL AND (minimo IS NULL OR {r}valor < minimo)
+                                 THEN {r}valor ELSE minimo END,
+                   maximo = CASE WHEN {r}valor IS NOT NULL AND (maximo IS NULL OR {r}valor > maximo)
+                                 THEN {r}valor ELSE maximo END
+             WHERE {_onde(r)};"""
+
+
+def _subtrair(r):
+    u, c, m = _chave(r)
+    grupo = (
+        f"IFNULL(usuario, '') = {u} AND IFNULL(categoria_id, 0) = {c} "
+        f"AND IFNULL(substr(data, 1, 7), '') = {m}"
+    )
+    return f"""
+            UPDATE {TABELA}
+               SET soma_centavos = soma_centavos - IFNULL({_centavos(r)}, 0),
+                   qtd = qtd - 1,
+                   qtd_valor = qtd_valor - ({r}valor IS NOT NULL)
+             WHERE {_onde(r)};
+            UPDATE {TABELA}
+               SET minimo = (SELECT MIN(valor) FROM Gastos WHERE {grupo}),
+                   maximo = (SELECT MAX(valor) FROM Gastos WHERE {grupo})
+             WHERE {_onde(r)} AND ({r}valor = minimo OR {r}valor = maximo);
+            DELETE FROM {TABELA} WHERE {_onde(r)} AND qtd <= 0;"""
+
+
+DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {TABELA} (
+        usuario TEXT NOT NULL,
+        categoria_id INTEGER NOT NULL,      -- 0 = sem categoria
+        mes TEXT NOT NULL,                  -- YYYY-MM ('' = sem data)
+        soma_centavos INTEGER NOT NULL DEFAULT 0,
+        qtd INTEGER NOT NULL DEFAULT 0,     -- linhas (COUNT(*))
+        qtd_valor INTEGER NOT NULL DEFAULT 0,  -- linhas com valor (para a média)
+        minimo REAL,
+        maximo REAL,
+        PRIMARY KEY (usuario, categoria_id, mes)
+    ) WITHOUT ROWID
+    """,
+    # Mesmas expressões da chave + valor: recálculo de MIN/MAX de um grupo é uma busca no índice
+    """
+    CREATE INDEX IF NOT EXISTS idx_gastos_grupo ON Gastos(
+        IFNULL(usuario, ''), IFNULL(categoria_id, 0), IFNULL(substr(data, 1, 7), ''), valor
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_insert
+        AFTER INSERT ON Gastos
+        WHEN {insercao_lote.SEM_LOTE}
+        BEGIN{_somar("NEW.")}
+        END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_delete
+        AFTER DELETE ON Gastos
+        BEGIN{_subtrair("OLD.")}
+        END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_update
+        AFTER UPDATE OF data, valor, usuario, categoria_id ON Gastos
+        WHEN OLD.data IS NOT NEW.data OR OLD.valor IS NOT NEW.valor
+          OR OLD.usuario IS NOT NEW.usuario OR OLD.categoria_id IS NOT NEW.categoria_id
+        BEGIN{_subtrair("OLD.")}{_somar("NEW.")}
+        END;
+    """,
+]
+
+_AGREGADO = f"""
+    SELECT {", ".join(_chave(""))},
+           IFNULL(SUM({_centavos("")}), 0), COUNT(*), COUNT(valor), MIN(valor), MAX(valor)
+      FROM Gastos
+     GROUP BY 1, 2, 3
+"""
+
+
+def criar(cur):
+    insercao_lote.criar(cur)
+    for sql in DDL:
+        cur.execute(sql)
+
+
+def somar_desde(cur, ultimo_id):
+    """Soma ao resumo as linhas de Gastos com id > `ultimo_id` (um INSERT em lote),
+    com um upsert por grupo em vez do trigger por linha."""
+    cur.execute(
+        f"""
+        INSERT INTO {TABELA} (usuario, categoria_id, mes, soma_centavos, qtd, qtd_valor, minimo, maximo)
+        SELECT {", ".join(_chave(""))},
+               IFNULL(SUM({_centavos("")}), 0), COUNT(*), COUNT(valor), MIN(valor), MAX(valor)
+          FROM Gastos
+         WHERE id > ?
+         GROUP BY 1, 2, 3
+        ON CONFLICT (usuario, categoria_id, mes) DO UPDATE
+           SET soma_centavos = soma_centavos + excluded.soma_centavos,
+               qtd = qtd + excluded.qtd,
+               qtd_valor = qtd_valor + excluded.qtd_valor,
+               minimo = CASE WHEN excluded.minimo IS NOT NULL AND (minimo IS NULL OR excluded.minimo < minimo)
+                             THEN excluded.minimo ELSE minimo END,
+               maximo = CASE WHEN excluded.maximo IS NOT NULL AND (maximo IS NULL OR excluded.maximo > maximo)
+                             THEN excluded.maximo ELSE maximo END
+        """,
+        (ultimo_id,),
+    )
+
+
+def reconstruir(cur):
+    """Recalcula o resumo inteiro a partir de Gastos."""
+    cur.execute(f"DELETE FROM {TABELA}")
+    cur.execute(
+        f"""
+        INSERT INTO {TABELA} (usuario, categoria_id, mes, soma_centavos, qtd, qtd_valor, minimo, maximo)
+        {_AGREGADO}
+        """
+    )
+
+
+def conferir(conn):
+    """Grupos em que o resumo difere de um GROUP BY direto em Gastos (lista vazia = ok)."""
+    esperado = {r[:3]: r[3:] for r in conn.execute(_AGREGADO)}
+    atual = {
+        r[:3]: r[3:]
+        for r in conn.execute(
+            f"SELECT usuario, categoria_id, mes, soma_centavos, qtd, qtd_valor, minimo, maximo FROM {TABELA}"
+        )
+    }
+    return [
+        (chave, atual.get(chave), esperado.get(chave))
+        for chave in sorted(set(esperado) | set(atual), key=str)
+        if atual.get(chave) != esperado.get(chave)
+    ]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Resumo mensal de gastos (ResumoMensal).")
+    ap.add_argument("--db", default=os.environ.get("DB_PATH", "/data/Gasto.db"))
+    grupo = ap.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--reconstruir", action="store_true", help="recalcula a tabela inteira")
+    grupo.add_argument("--conferir", action="store_true", help="compara com Gastos e lista diferenças")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA busy_timeout=3000;")
+    if args.reconstruir:
+        with conn:
+            reconstruir(conn.cursor())
+        print(f"{TABELA} reconstruído.")
+    else:
+        diferencas = conferir(conn)
+        for chave, atual, esperado in diferencas:
+            print(f"{chave}: resumo={atual} esperado={esperado}")
+        print(f"{len(diferencas)} grupo(s) com diferença.")
+    conn.close()
@@ -0,0 +1,300 @@
+"""Tarefas longas da Gerência em segundo plano (recategorizar, sincronizar, harmonizar).
+
+A página só enfileira uma linha em `Tarefas` (migracoes.m011) e acompanha o
+estado; um worker (thread do processo do Streamlit, ou `python tarefas.py`)
+executa uma tarefa por vez, na ordem de id.
+
+A recategorização grava em blocos de `LINHAS_POR_BLOCO` linhas, cada bloco
+na sua transação curta, junto com o progresso da tarefa (último id de Gastos
+processado): entre um bloco e outro a API consegue o lock de escrita, e uma
+tarefa interrompida (processo reiniciado) é retomada do último bloco gravado.
+
+O worker marca `batida` a cada bloco; tarefa 'rodando' sem batida há mais de
+`PRAZO` segundos é de um worker que morreu e volta a ser executada.
+
+Uso manual (worker em primeiro plano):
+    python tarefas.py [--db /data/Gasto.db]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import recategorizacao
+from normalizacao import TAMANHO_MINIMO, normalizar_texto, tamanho_util
+
+LINHAS_POR_BLOCO = 2_000  # menor que o da Gerência inline: cada transação segura o lock por pouco tempo
+PAUSA = 0.01  # entre blocos, para a API pegar o lock
+INTERVALO = 1.0  # espera com a fila vazia
+PRAZO = 30.0  # sem batida por mais que isso: o worker morreu
+ATIVAS = ("pendente", "rodando")
+
+EXECUTORES = {}
+
+
+class TarefaPerdida(Exception):
+    """A tarefa passou para outro worker (esta ficou sem batida por mais que PRAZO)."""
+
+
+def executor(tipo):
+    def registrar(fn):
+        EXECUTORES[tipo] = fn
+        return fn
+    return registrar
+
+
+def enfileirar(conn, tipo, **parametros) -> int:
+    """Acrescenta uma tarefa e devolve o id. Não faz commit: quem chama grava a
+    tarefa na mesma transação da mudança que a originou."""
+    if tipo not in EXECUTORES:
+        raise ValueError(f"Tarefa desconhecida: {tipo}")
+    cur = conn.execute(
+        "INSERT INTO Tarefas (tipo, parametros, criada_em) VALUES (?, ?, ?)",
+        (tipo, json.dumps(parametros, ensure_ascii=False), time.time()),
+    )
+    return cur.lastrowid
+
+
+def listar(conn, ids=None, limite=10):
+    """Tarefas (dicts) mais recentes primeiro; com `ids`, só essas."""
+    sql = "SELECT * FROM Tarefas"
+    params = []
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return []
+        sql += f" WHERE id IN ({','.join('?' * len(ids))})"
+        params = ids
+    cur = conn.execute(sql + " ORDER BY id DESC LIMIT ?", params + [limite])
+    colunas = [d[0] for d in cur.description]
+    return [dict(zip(colunas, linha)) for linha in cur.fetchall()]
+
+
+def ativas(conn) -> int:
+    marcas = ",".join("?" * len(ATIVAS))
+    return conn.execute(f"SELECT COUNT(*) FROM Tarefas WHERE estado IN ({marcas})", ATIVAS).fetchone()[0]
+
+
+def fracao(tarefa) -> float:
+    """Progresso de 0 a 1 (pelo id de Gastos; só aproximado na sincronização)."""
+    if tarefa["estado"] == "concluida":
+        return 1.0
+    if not tarefa["total"]:
+        return 0.0
+    return min(1.0, tarefa["progresso"] / tarefa["total"])
+
+
+# EXECUTORES
+# Recebem (conn, tarefa, avancar); `avancar(ultimo_id, examinadas, alteradas)`
+# grava o progresso e faz commit junto com o que o bloco mudou.
+
+
+@executor("recategorizar")
+@executor("sincronizar")
+def _recategorizar(conn, tarefa, avancar):
+    parametros = json.loads(tarefa["parametros"])
+    recategorizacao.recategorizar(
+        conn,
+        set(parametros.get("bloqueadas", ())),
+        palavras=parametros.get("palavras"),
+        linhas_por_bloco=LINHAS_POR_BLOCO,
+        inicio=tarefa["progresso"],
+        ao_concluir_bloco=avancar,
+    )
+
+
+@executor("harmonizar")
+def _harmonizar(conn, tarefa, avancar):
+    """Cria em Categorias as categorias usadas em Gastos que ainda não existem lá.
+
+    Ignora bloqueadas e nomes com menos de 4 caracteres úteis; usa a própria
+    categoria como palavra-chave (lower) e categoria (Title). Examinadas são as
+    faltantes; alteradas, as criadas. Poucas linhas: um bloco só.
+    """
+    bloqueadas = set(json.loads(tarefa["parametros"]).get("bloqueadas", ()))
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT DISTINCT n.nome
+          FROM (SELECT DISTINCT categoria_id FROM Gastos) g
+          JOIN NomesCategorias n ON n.id = g.categoria_id
+          LEFT JOIN Categorias c ON c.categoria = n.nome
+         WHERE c.categoria IS NULL
+    """
+    )
+    faltantes = [r[0] for r in cur.fetchall()]
+    adicionadas = 0
+    for cat in faltantes:
+        cat_str = (cat or "").strip()
+        if (cat_str in bloqueadas) or (tamanho_util(cat_str) < TAMANHO_MINIMO):
+            continue
+        cur.execute(
+            """
+            INSERT OR IGNORE INTO Categorias (palavra_chave, palavra_norm, categoria)
+            VALUES (?, ?, ?)
+        """,
+            (cat_str.lower(), normalizar_texto(cat_str), cat_str.title()),
+        )
+        adicionadas += cur.rowcount > 0
+    avancar(tarefa["progresso"], len(faltantes), adicionadas)
+
+
+# WORKER
+
+
+def _pegar(conn, dono):
+    """Marca como 'rodando' a próxima tarefa (pendente ou órfã) e a devolve; None
+    se a fila está vazia ou outro worker vivo está com uma tarefa."""
+    agora = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        viva = conn.execute(
+            "SELECT 1 FROM Tarefas WHERE estado = 'rodando' AND batida >= ? LIMIT 1", (agora - PRAZO,)
+        ).fetchone()
+        linha = None if viva else conn.execute(
+            "SELECT id FROM Tarefas WHERE estado IN ('pendente', 'rodando') ORDER BY id LIMIT 1"
+        ).fetchone()
+        if linha is None:
+            conn.execute("ROLLBACK")
+            return None
+        conn.execute(
+            """
+            UPDATE Tarefas
+               SET estado = 'rodando', dono = ?, batida = ?,
+                   total = COALESCE(total, (SELECT MAX(id) FROM Gastos))
+             WHERE id = ?
+        """,
+            (dono, agora, linha[0]),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return listar(conn, ids=[linha[0]])[0]
+
+
+def executar(conn, tarefa, dono):
+    """Roda uma tarefa já marcada como 'rodando' até o fim (ou erro)."""
+    id_ = tarefa["id"]
+
+    def avancar(ultimo, examinadas, alteradas):
+        cur = conn.execute(
+            """
+            UPDATE Tarefas
+               SET progresso = ?, examinadas = examinadas + ?, alteradas = alteradas + ?, batida = ?
+             WHERE id = ? AND dono = ?
+        """,
+            (ultimo, examinadas, alteradas, time.time(), id_, dono),
+        )
+        if cur.rowcount == 0:
+            raise TarefaPerdida(id_)
+        conn.commit()
+        time.sleep(PAUSA)
+
+    try:
+        EXECUTORES[tarefa["tipo"]](conn, tarefa, avancar)
+        conn.execute(
+            "UPDATE Tarefas SET estado = 'concluida', concluida_em = ? WHERE id = ? AND dono = ?",
+            (time.time(), id_, dono),
+        )
+        conn.commit()
+    except TarefaPerdida:
+        conn.rollback()  # o bloco em curso é refeito por quem pegou a tarefa
+    except Exception as e:
+        conn.rollback()
+        conn.execute(
+            "UPDATE Tarefas SET estado = 'erro', erro = ?, concluida_em = ? WHERE id = ? AND dono = ?",
+            (f"{type(e).__name__}: {e}", time.time(), id_, dono),
+        )
+        conn.commit()
+        print(f"Tarefa {id_} ({tarefa['tipo']}) falhou: {e}", flush=True)
+
+
+class Worker:
+    def __init__(self, db_path):
+        self._db_path = db_path
+        self._dono = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self.rodar, name="tarefas-gerencia", daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self, timeout=None):
+        self._parar.set()
+        self._thread.join(timeout)
+
+    def vivo(self) -> bool:
+        return self._thread.is_alive()
+
+    def _descartar(self, conn):
+        try:
+            conn.rollback()
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def rodar(self):
+        conn = None
+        ultimo_erro = None
+        try:
+            while not self._parar.is_set():
+                try:
+                    if conn is None:
+                        # mode=rw: não cria um banco vazio antes da API migrar
+                        conn = sqlite3.connect(f"file:{self._db_path}?mode=rw", uri=True)
+                        conn.execute("PRAGMA busy_timeout=10000;")
+                    tarefa = _pegar(conn, self._dono)
+                except sqlite3.OperationalError as e:  # banco ocupado, ainda sem o arquivo ou a tabela
+                    if str(e) != ultimo_erro:
+                        print(f"Worker de tarefas: {e}", flush=True)
+                    ultimo_erro = str(e)
+                    tarefa = None
+                except Exception as e:
+                    print(f"Worker de tarefas: erro ao buscar tarefa: {type(e).__name__}: {e}", flush=True)
+                    if conn is not None:
+                        self._descartar(conn)
+                    conn = tarefa = None
+                if tarefa is None:
+                    self._parar.wait(INTERVALO)
+                    continue
+                try:
+                    executar(conn, tarefa, self._dono)
+                except Exception as e:
+                    # nem o estado de erro foi gravado (ex.: "database is locked" no próprio
+                    # UPDATE): a tarefa fica 'rodando' sem batida e é retomada depois de PRAZO
+                    print(f"Worker de tarefas: tarefa {tarefa['id']} interrompida: {type(e).__name__}: {e}", flush=True)
+                    self._descartar(conn)
+                    conn = None
+                    self._parar.wait(INTERVALO)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def iniciar(db_path):
+    """Worker do processo (um só; recriado se a thread anterior morreu)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.vivo():
+            _worker = Worker(db_path).iniciar()
+        return _worker
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Worker das tarefas da Gerência.")
+    ap.add_argument("--db", default=os.environ.get("DB_PATH", "/data/Gasto.db"))
+    args = ap.parse_args()
+    try:
+        Worker(args.db).rodar()
+    except KeyboardInterrupt:
+        pass
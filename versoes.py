@@ -0,0 +1,56 @@
+"""Versão por tabela, para chavear caches (dashboard e Gerência).
+
+Cada tabela tem um contador em `Versoes` mantido por triggers (migracoes.py):
+um cache guarda na chave a versão das tabelas que leu e só deixa de valer
+quando uma delas muda — editar Categorias não derruba os gráficos de Gastos.
+
+Gastos não tem contador de INSERT (seria uma escrita a mais por notificação):
+a versão dela é (maior id, `Gastos_reescritas`). Os ids são AUTOINCREMENT e
+UPDATE/DELETE incrementam `Gastos_reescritas`, então qualquer mudança altera
+o par.
+
+Banco sem os contadores (ainda não migrado): a versão cai para o
+`PRAGMA data_version` de uma conexão sentinela do processo, que muda a cada
+commit de outra conexão — invalida tudo a qualquer escrita, mas nunca
+devolve dado velho.
+"""
+
+import sqlite3
+import threading
+
+# tabela -> linha de Versoes com o contador dela
+CONTADORES = {
+    "Categorias": "Categorias",
+    "NomesCategorias": "NomesCategorias",
+    "Gastos": "Gastos_reescritas",
+}
+
+_sentinelas = {}
+_sentinelas_lock = threading.Lock()
+
+
+def _data_version(conn):
+    """data_version da conexão sentinela do mesmo arquivo (aberta uma vez por processo)."""
+    caminho = conn.execute("PRAGMA database_list").fetchone()[2]
+    with _sentinelas_lock:
+        sentinela = _sentinelas.get(caminho)
+        if sentinela is None:
+            sentinela = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False)
+            _sentinelas[caminho] = sentinela
+        return sentinela.execute("PRAGMA data_version").fetchone()[0]
+
+
+def versao(conn, *tabelas):
+    """Tupla que muda sempre que alguma das tabelas muda (chave de cache)."""
+    linhas = [CONTADORES[t] for t in tabelas]
+    marcas = ",".join("?" * len(linhas))
+    try:
+        contadores = dict(
+            conn.execute(f"SELECT tabela, versao FROM Versoes WHERE tabela IN ({marcas})", linhas).fetchall()
+        )
+        max_id = conn.execute("SELECT MAX(id) FROM Gastos").fetchone()[0] if "Gastos" in tabelas else None
+    except sqlite3.OperationalError:  # sem a tabela Versoes
+        contadores = {}
+    if any(l not in contadores for l in linhas):
+        return ("data_version", _data_version(conn))
+    return tuple((max_id, contadores[l]) if t == "Gastos" else contadores[l] for t, l in zip(tabelas, linhas))